@@ -1,31 +1,20 @@
-import nbformat
 import pytest
 import pandas as pd
-from nbconvert.preprocessors import ExecutePreprocessor
+from harness import kernel_namespace
+
+
+REQUIRED_VARS = ["subscription_report", "subscription_summary"]
 
 
 @pytest.mark.parametrize("notebook", ["final_notebook.ipynb"])
 def test_notebook_exec(notebook):
     """Test that the final notebook executes without errors."""
-    with open(notebook) as f:
-        nb = nbformat.read(f, as_version=4)
-        ep = ExecutePreprocessor(timeout=600, kernel_name="python3")
-        try:
-            ep.preprocess(nb)
-        except Exception as e:
-            pytest.fail(f"Notebook execution failed: {e}")
+    kernel_namespace(notebook, REQUIRED_VARS)
 
 
 def get_notebook_namespace(notebook_path):
-    """Execute all code cells and return the namespace."""
-    with open(notebook_path) as f:
-        nb = nbformat.read(f, as_version=4)
-
-    ns = {}
-    for cell in nb.cells:
-        if cell.cell_type == "code":
-            exec(cell.source, ns)
-    return ns
+    """Return the session-cached namespace for the notebook."""
+    return kernel_namespace(notebook_path, REQUIRED_VARS)
 
 
 def test_subscription_report_output():
@@ -1,30 +1,20 @@
-import nbformat
 import pytest
-from nbconvert.preprocessors import ExecutePreprocessor
+from harness import kernel_namespace
 import numpy as np
 
 
+REQUIRED_VARS = ["weighted_avg"]
+
+
 @pytest.mark.parametrize("notebook", ["final_notebook.ipynb"])
 def test_notebook_exec(notebook):
     """Test that notebooks execute without errors."""
-    with open(notebook) as f:
-        nb = nbformat.read(f, as_version=4)
-        ep = ExecutePreprocessor(timeout=600, kernel_name="python3")
-        try:
-            assert ep.preprocess(nb) is not None, f"Got empty notebook for {notebook}"
-        except Exception:
-            assert False, f"Failed executing {notebook}"
+    kernel_namespace(notebook, REQUIRED_VARS)
 
 
 def get_notebook_namespace(notebook_path):
-    """Execute notebook cells and return namespace with all variables."""
-    with open(notebook_path) as f:
-        nb = nbformat.read(f, as_version=4)
-    namespace = {}
-    for cell in nb.cells:
-        if cell.cell_type == "code":
-            exec(cell.source, namespace)
-    return namespace
+    """Return the session-cached namespace for the notebook."""
+    return kernel_namespace(notebook_path, REQUIRED_VARS)
 
 
 def test_notebook_variables():
@@ -1,31 +1,24 @@
-import nbformat
 import pytest
 import numpy as np
 import scipy.linalg as la
-from nbconvert.preprocessors import ExecutePreprocessor
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+from harness import kernel_namespace
+
+
+REQUIRED_VARS = ["result", "analyze_quantum_hamiltonian", "lattice_hamiltonian",
+                 "analyze_hamiltonian_ensemble", "ensemble"]
 
 
 @pytest.mark.parametrize("notebook", ["final_notebook.ipynb"])
 def test_notebook_exec(notebook):
     """Ensure notebook runs without errors."""
-    with open(notebook) as f:
-        nb = nbformat.read(f, as_version=4)
-        ep = ExecutePreprocessor(timeout=600, kernel_name="python3")
-        try:
-            assert ep.preprocess(nb) is not None, f"Got empty notebook for {notebook}"
-        except Exception as e:
-            assert False, f"Failed executing {notebook}: {e}"
+    kernel_namespace(notebook, REQUIRED_VARS)
 
 
 def get_notebook_namespace(path):
-    """Executes notebook cells and returns variables."""
-    with open(path) as f:
-        nb = nbformat.read(f, as_version=4)
-    ns = {}
-    for cell in nb.cells:
-        if cell.cell_type == "code":
-            exec(cell.source, ns)
-    return ns
+    """Return the session-cached namespace for the notebook."""
+    return kernel_namespace(path, REQUIRED_VARS)
 
 
 def test_hamiltonian_analysis():
@@ -64,3 +57,135 @@ def test_hamiltonian_analysis():
     sr = result["stability_report"]
     assert sr["well_conditioned"] and sr["is_symmetric"] and sr["full_rank"]
     print("All Hamiltonian checks passed.")
+
+
+def test_single_decomposition_diagnostics_match_numpy():
+    """Eigenvalue-derived norms, conditioning and rank match the direct numpy routines."""
+    ns = get_notebook_namespace("final_notebook.ipynb")
+    analyze = ns["analyze_quantum_hamiltonian"]
+    rng = np.random.default_rng(0)
+    base = rng.standard_normal((60, 60))
+    H = (base + base.T) / 2
+
+    for check in ["full", "randomized"]:
+        res = analyze(H, check=check)
+        assert res["eigen_reconstruction_valid"] is True and res["is_orthogonal"] is True
+        mn, sr = res["matrix_norms"], res["stability_report"]
+        assert np.isclose(mn["spectral"], np.linalg.norm(H, 2), rtol=1e-12)
+        assert np.isclose(mn["frobenius"], np.linalg.norm(H, "fro"), rtol=1e-12)
+        assert np.isclose(mn["1-norm"], np.linalg.norm(H, 1), rtol=1e-12)
+        assert np.isclose(mn["inf-norm"], np.linalg.norm(H, np.inf), rtol=1e-12)
+        assert np.isclose(sr["condition_number"], np.linalg.cond(H), rtol=1e-8)
+        assert sr["rank"] == np.linalg.matrix_rank(H)
+        assert res["is_positive_definite"] is bool(np.all(np.linalg.eigvalsh(H) > 0))
+
+    singular = np.diag([2.0, 1.0, 0.0, -1.0])
+    res = analyze(singular, check="randomized")
+    assert res["stability_report"]["rank"] == 3 and not res["stability_report"]["full_rank"]
+    assert res["is_positive_definite"] is False and res["ground_state_energy"] == -1.0
+    with pytest.raises(ValueError):
+        analyze(singular, check="none")
+
+
+def test_non_symmetric_input_uses_singular_values():
+    """Non-symmetric H is flagged and its norm, conditioning and rank come from an SVD."""
+    ns = get_notebook_namespace("final_notebook.ipynb")
+    H = np.array([[1.0, 5.0], [0.0, 2.0]])
+    res = ns["analyze_quantum_hamiltonian"](H)
+    sr = res["stability_report"]
+    assert sr["is_symmetric"] is False and res["eigen_reconstruction_valid"] is False
+    assert np.isclose(res["matrix_norms"]["spectral"], np.linalg.norm(H, 2), rtol=1e-12)
+    assert np.isclose(sr["condition_number"], np.linalg.cond(H), rtol=1e-10)
+    assert sr["rank"] == 2
+    assert res["is_positive_definite"] is bool(np.all(np.linalg.eigvalsh((H + H.T) / 2) > 0))
+
+    rng = np.random.default_rng(5)
+    Hs = rng.standard_normal((6, 4, 4))
+    ens = ns["analyze_hamiltonian_ensemble"](Hs, chunk=4)
+    assert not ens["is_symmetric"].any()
+    assert np.allclose(ens["spectral"], np.linalg.norm(Hs, 2, axis=(1, 2)), rtol=1e-12)
+    assert np.allclose(ens["condition_number"], np.linalg.cond(Hs), rtol=1e-8)
+
+
+def test_sparse_mode_matches_dense_lowest_states():
+    """Sparse and LinearOperator inputs reproduce the lowest dense eigenvalues, norms and conditioning."""
+    ns = get_notebook_namespace("final_notebook.ipynb")
+    analyze = ns["analyze_quantum_hamiltonian"]
+    H = ns["lattice_hamiltonian"](20)
+    dense = H.toarray()
+    w = np.linalg.eigvalsh(dense)
+    k = 4
+
+    for method in ["lanczos", "lobpcg"]:
+        res = analyze(H, k=k, method=method)
+        assert set(res) == set(analyze(dense))
+        assert np.allclose(res["eigenvalues"], w[:k], rtol=1e-7)
+        assert res["eigenvectors"].shape == (H.shape[0], k)
+        assert res["eigen_reconstruction_valid"] is True and res["is_orthogonal"] is True
+        mn, sr = res["matrix_norms"], res["stability_report"]
+        assert np.isclose(mn["spectral"], np.abs(w).max(), rtol=1e-8)
+        assert np.isclose(mn["frobenius"], np.linalg.norm(dense, "fro"), rtol=1e-12)
+        assert np.isclose(mn["1-norm"], np.linalg.norm(dense, 1), rtol=1e-12)
+        assert np.isclose(sr["condition_number"], np.linalg.cond(dense), rtol=1e-6)
+        assert res["is_positive_definite"] is True and sr["trace_conserved"] is None
+
+    op = spla.LinearOperator(H.shape, matvec=lambda x: H @ x, dtype=float)
+    res = analyze(op, k=k)
+    assert np.allclose(res["eigenvalues"], w[:k], rtol=1e-7)
+    assert np.isclose(res["matrix_norms"]["1-norm"], np.linalg.norm(dense, 1), rtol=1e-6)
+    assert np.isclose(res["matrix_norms"]["frobenius"], np.linalg.norm(dense, "fro"), rtol=0.2)
+
+    # Indefinite sparse H: conditioning from the eigenvalue nearest zero
+    shifted = H - 5.0 * sp.identity(H.shape[0])
+    res = analyze(shifted, k=k)
+    assert res["is_positive_definite"] is False
+    assert np.isclose(res["stability_report"]["condition_number"],
+                      np.linalg.cond(shifted.toarray()), rtol=1e-6)
+
+
+    # Singular indefinite sparse H: the shift-invert factorization fails
+    singular = sp.diags([1.0, 0.0, -1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+    sr = analyze(singular, k=2)["stability_report"]
+    assert sr["condition_number"] == np.inf and sr["full_rank"] is False
+
+    for bad_k in [0, H.shape[0]]:
+        with pytest.raises(ValueError):
+            analyze(op, k=bad_k)
+
+
+def test_ensemble_matches_per_matrix_analysis():
+    """Chunked ensemble analysis agrees with analyze_quantum_hamiltonian matrix by matrix."""
+    ns = get_notebook_namespace("final_notebook.ipynb")
+    analyze = ns["analyze_quantum_hamiltonian"]
+    ensemble_fn = ns["analyze_hamiltonian_ensemble"]
+    rng = np.random.default_rng(3)
+    A = rng.standard_normal((23, 12, 12))
+    Hs = (A + np.swapaxes(A, 1, 2)) / 2
+    Hs[:8] = np.swapaxes(A[:8], 1, 2) @ A[:8] + np.eye(12)
+    Hs[8] = np.diag([2.0, 1.0, 0.0] + [1.0] * 9)
+    Hs[9] += 1e-3 * np.triu(np.ones((12, 12)), 1)
+
+    for check in ["full", "randomized"]:
+        ens = ensemble_fn(Hs, chunk=5, check=check)
+        assert all(v.shape[0] == len(Hs) for v in ens.values())
+        for i, H in enumerate(Hs):
+            res = analyze(H, check=check)
+            mn, sr = res["matrix_norms"], res["stability_report"]
+            assert np.allclose(ens["eigenvalues"][i], res["eigenvalues"], atol=1e-12)
+            assert ens["ground_state_energy"][i] == pytest.approx(res["ground_state_energy"], abs=1e-12)
+            for key in ["frobenius", "spectral", "1-norm", "inf-norm"]:
+                assert ens[key][i] == pytest.approx(mn[key], rel=1e-12)
+            assert ens["condition_number"][i] == pytest.approx(sr["condition_number"], rel=1e-8)
+            assert ens["rank"][i] == sr["rank"]
+            for key in ["eigen_reconstruction_valid", "is_orthogonal", "is_positive_definite"]:
+                assert ens[key][i] == res[key], (i, key)
+            for key in ["trace_conserved", "is_symmetric", "full_rank", "well_conditioned"]:
+                assert ens[key][i] == sr[key], (i, key)
+
+    assert not ens["full_rank"][8] and not ens["is_symmetric"][9]
+    whole = ensemble_fn(Hs, chunk=len(Hs))
+    assert all(np.array_equal(whole[k], ensemble_fn(Hs, chunk=1)[k]) for k in whole)
+
+    demo = ns["ensemble"]
+    assert demo["ground_state_energy"].shape == (1000,)
+    assert demo["is_positive_definite"].all() and demo["eigen_reconstruction_valid"].all()
@@ -1,21 +1,14 @@
-import nbformat, pytest, numpy as np, pandas as pd
-from nbconvert.preprocessors import ExecutePreprocessor
+import pytest, numpy as np, pandas as pd
+from harness import kernel_namespace
+
+REQUIRED_VARS = ["factory_stats", "highest_std_factory"]
 
 @pytest.mark.parametrize("notebook", ["final_notebook.ipynb"])
 def test_notebook_exec(notebook):
-    with open(notebook) as f:
-        nb = nbformat.read(f, as_version=4)
-        ep = ExecutePreprocessor(timeout=600, kernel_name="python3")
-        ep.preprocess(nb)
+    kernel_namespace(notebook, REQUIRED_VARS)
 
 def get_notebook_namespace(path):
-    with open(path) as f:
-        nb = nbformat.read(f, as_version=4)
-    ns = {}
-    for cell in nb.cells:
-        if cell.cell_type == "code":
-            exec(cell.source, ns)
-    return ns
+    return kernel_namespace(path, REQUIRED_VARS)
 
 def test_std_factory():
     ns = get_notebook_namespace("final_notebook.ipynb")
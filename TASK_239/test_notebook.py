@@ -1,29 +1,19 @@
 
-import nbformat
 import pytest
-from nbconvert.preprocessors import ExecutePreprocessor
+from harness import kernel_namespace
 import numpy as np
 
+REQUIRED_VARS = ["simulate_oscillator", "simulate_oscillators", "rk4_step_matrix",
+                 "streamed_diagnostics"]
+
 @pytest.mark.parametrize("notebook", ["final_notebook.ipynb"])
 def test_notebook_exec(notebook):
     """Ensure the notebook runs without errors."""
-    with open(notebook, "r", encoding="utf-8") as f:
-        nb = nbformat.read(f, as_version=4)
-    ep = ExecutePreprocessor(timeout=600, kernel_name="python3")
-    try:
-        ep.preprocess(nb)
-    except Exception as e:
-        assert False, f"Failed executing {notebook}: {e}"
+    kernel_namespace(notebook, REQUIRED_VARS)
 
 def get_notebook_namespace(notebook_path):
-    """Execute notebook cells and return global namespace."""
-    with open(notebook_path, "r", encoding="utf-8") as f:
-        nb = nbformat.read(f, as_version=4)
-    ns = {}
-    for cell in nb.cells:
-        if cell.cell_type == "code":
-            exec(cell.source, ns)
-    return ns
+    """Return the session-cached namespace for the notebook."""
+    return kernel_namespace(notebook_path, REQUIRED_VARS)
 
 def test_function_exists_and_returns_dict():
     ns = get_notebook_namespace("final_notebook.ipynb")
@@ -56,3 +46,77 @@ def test_accuracy_vs_analytic_and_energy_decay_and_peak_freq():
         f"energy_ratio_end {result['energy_ratio_end']} not close to expected ~{expected_energy_ratio}"
     )
 
+def test_batched_sweep_matches_single_runs():
+    """The batched RK4 sweep reproduces per-system runs and diagnostics."""
+    ns = get_notebook_namespace("final_notebook.ipynb")
+    m = np.array([1.0, 2.0, 0.5])
+    c = np.array([0.2, 0.5, 0.1])
+    k = np.array([4.0, 9.0, 1.0])
+    batch = ns["simulate_oscillators"](m, c, k, 1.0, np.array([0.0, 0.5, -1.0]), T=5.0)
+    assert batch["x"].shape == batch["v"].shape == (3, len(batch["t"]))
+    for key in ["max_abs_error", "energy_ratio_end", "peak_freq"]:
+        assert batch[key].shape == (3,)
+
+    for b, v0 in enumerate([0.0, 0.5, -1.0]):
+        single = ns["simulate_oscillator"](m[b], c[b], k[b], 1.0, v0, T=5.0)
+        assert np.array_equal(batch["t"], single["t"])
+        assert np.allclose(batch["x"][b], single["x"], rtol=0, atol=1e-14)
+        assert np.allclose(batch["v"][b], single["v"], rtol=0, atol=1e-14)
+        for key in ["max_abs_error", "energy_ratio_end", "peak_freq"]:
+            assert np.isclose(batch[key][b], single[key], rtol=1e-12, atol=1e-15)
+    assert np.all(batch["max_abs_error"] < 2e-4)
+
+def test_propagator_matches_loop():
+    """The loop-free RK4 propagator agrees with the stepwise loop to round-off."""
+    ns = get_notebook_namespace("final_notebook.ipynb")
+    sim = ns["simulate_oscillator"]
+    for params in [{}, {"m": 2.0, "c": 0.5, "k": 9.0, "v0": 0.5}, {"c": 0.01, "T": 50.0}]:
+        loop = sim(**params)
+        prop = sim(**params, method="propagator")
+        assert np.array_equal(loop["t"], prop["t"])
+        assert np.allclose(prop["x"], loop["x"], rtol=0, atol=1e-11)
+        assert np.allclose(prop["v"], loop["v"], rtol=0, atol=1e-11)
+        assert np.isclose(prop["energy_ratio_end"], loop["energy_ratio_end"], rtol=1e-10)
+        assert prop["peak_freq"] == loop["peak_freq"]
+
+    # One step of the matrix equals one RK4 stage-by-stage step
+    M = ns["rk4_step_matrix"](1.0, 0.2, 4.0, 0.001)
+    one = sim(T=0.001)
+    assert np.allclose(M @ [1.0, 0.0], [one["x"][1], one["v"][1]], rtol=0, atol=1e-15)
+    with pytest.raises(ValueError):
+        sim(method="euler")
+
+def test_adaptive_dopri_and_memmap_streaming(tmp_path):
+    """Adaptive Dormand-Prince meets the accuracy target in few steps and streams to .npy."""
+    ns = get_notebook_namespace("final_notebook.ipynb")
+    sim = ns["simulate_oscillator"]
+    ref = sim()
+    res = sim(method="dopri")
+    assert res["max_abs_error"] < 2e-4
+    assert res["n_steps"] < ref["n_steps"] // 20
+    assert np.array_equal(res["t"], ref["t"])
+    assert np.isclose(res["energy_ratio_end"], ref["energy_ratio_end"], rtol=1e-4)
+    assert res["peak_freq"] == ref["peak_freq"]
+
+    path = tmp_path / "trajectory.npy"
+    streamed = sim(method="dopri", out=str(path))
+    stored = np.load(path, mmap_mode="r")
+    assert stored.shape == (3, len(ref["t"]))
+    assert np.array_equal(stored[1], res["x"]) and np.array_equal(stored[2], res["v"])
+    for key in ["max_abs_error", "energy_ratio_end", "peak_freq"]:
+        assert np.isclose(streamed[key], res[key], rtol=1e-12)
+
+    # Chunked diagnostics agree with the in-memory ones; subsampling keeps the peak bin close
+    diag = ns["streamed_diagnostics"](ref["t"], ref["x"], ref["v"], 1.0, 0.2, 4.0, 1.0, 0.0, 0.001,
+                                      chunk=777, max_fft_points=1000)
+    assert diag[0] == ref["max_abs_error"] and np.isclose(diag[1], ref["energy_ratio_end"])
+    assert abs(diag[2] - ref["peak_freq"]) < 0.01
+    with pytest.raises(ValueError):
+        sim(out=str(path))
+
+    # T shorter than half a step rounds to an empty grid, as in the RK4 methods
+    short = sim(method="dopri", T=0.0005)
+    tiny = sim(T=0.0005)
+    assert short["n_steps"] == 0 and len(short["t"]) == 1
+    for key in ["t", "x", "v"]:
+        assert np.array_equal(short[key], tiny[key])
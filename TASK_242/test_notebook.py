@@ -1,27 +1,20 @@
-import nbformat
 import pytest
 import numpy as np
-from nbconvert.preprocessors import ExecutePreprocessor
+from harness import kernel_namespace
+
+REQUIRED_VARS = [
+    "cv_scores", "cv_mean_score", "cv_std_score", "stratified_cv_scores",
+    "stratified_cv_mean", "stratified_cv_std", "cv_f1_scores", "cv_f1_mean",
+    "cv_roc_auc_scores", "cv_roc_auc_mean",
+]
 
 @pytest.mark.parametrize("notebook", ["final_notebook.ipynb"])
 def test_notebook_exec(notebook):
     """Ensure notebook executes cleanly."""
-    with open(notebook) as f:
-        nb = nbformat.read(f, as_version=4)
-        ep = ExecutePreprocessor(timeout=600, kernel_name="python3")
-        try:
-            ep.preprocess(nb)
-        except Exception as e:
-            assert False, f"Failed executing {notebook}: {e}"
+    kernel_namespace(notebook, REQUIRED_VARS)
 
 def get_notebook_namespace(notebook_path):
-    with open(notebook_path) as f:
-        nb = nbformat.read(f, as_version=4)
-    ns = {}
-    for cell in nb.cells:
-        if cell.cell_type == "code":
-            exec(cell.source, ns)
-    return ns
+    return kernel_namespace(notebook_path, REQUIRED_VARS)
 
 def test_cross_validation_results():
     ns = get_notebook_namespace("final_notebook.ipynb")
@@ -1,29 +1,20 @@
-import nbformat
 import pytest
 import numpy as np
-from nbconvert.preprocessors import ExecutePreprocessor
+from harness import kernel_namespace
 
 NOTEBOOK = "main_final.ipynb"
+REQUIRED_VARS = [
+    "model_metrics", "feature_importance_dict", "default_probabilities", "df",
+    "X_train",
+]
 
 @pytest.mark.parametrize("notebook", ["final_notebook.ipynb"])
 def test_notebook_exec(notebook):
     """Notebook executes without errors."""
-    with open(notebook, "r", encoding="utf-8") as f:
-        nb = nbformat.read(f, as_version=4)
-    ep = ExecutePreprocessor(timeout=600, kernel_name="python3")
-    try:
-        ep.preprocess(nb)
-    except Exception as e:
-        assert False, f"Failed executing {notebook}: {e}"
+    kernel_namespace(notebook, REQUIRED_VARS)
 
 def get_notebook_namespace(notebook_path):
-    with open(notebook_path, "r", encoding="utf-8") as f:
-        nb = nbformat.read(f, as_version=4)
-    ns = {}
-    for cell in nb.cells:
-        if cell.cell_type == "code":
-            exec(cell.source, ns)
-    return ns
+    return kernel_namespace(notebook_path, REQUIRED_VARS)
 
 def test_required_variables_and_types():
     ns = get_notebook_namespace("final_notebook.ipynb")
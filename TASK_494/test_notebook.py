@@ -1,27 +1,20 @@
-import nbformat
 import pytest
-from nbconvert.preprocessors import ExecutePreprocessor
+from harness import kernel_namespace
 import numpy as np
 
 
+REQUIRED_VARS = ["predict_turnover", "df"]
+
+
 @pytest.mark.parametrize("notebook", ["final_notebook.ipynb"])
 def test_notebook_exec(notebook):
     """Ensure inventory notebook runs fully without failure."""
-    with open(notebook) as f:
-        nb = nbformat.read(f, as_version=4)
-        ep = ExecutePreprocessor(timeout=600, kernel_name="python3")
-        assert ep.preprocess(nb) is not None
+    kernel_namespace(notebook, REQUIRED_VARS)
 
 
 def get_notebook_namespace(path):
-    """Load notebook and execute all code."""
-    with open(path) as f:
-        nb = nbformat.read(f, as_version=4)
-    ns = {}
-    for cell in nb.cells:
-        if cell.cell_type == "code":
-            exec(cell.source, ns)
-    return ns
+    """Return the session-cached namespace for the notebook."""
+    return kernel_namespace(path, REQUIRED_VARS)
 
 
 def test_predict_turnover_function_exists():
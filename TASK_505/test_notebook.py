@@ -1,27 +1,24 @@
-import nbformat
 import pytest
-from nbconvert.preprocessors import ExecutePreprocessor
+from harness import kernel_namespace
 import numpy as np
 
 
+REQUIRED_VARS = [
+    "cv_accuracy_scores", "cv_accuracy_mean", "cv_accuracy_std", "rf_cv_scores",
+    "rf_cv_mean", "rf_cv_std", "stratified_lr_scores", "stratified_rf_scores",
+    "lr", "rf", "X_train",
+]
+
+
 @pytest.mark.parametrize("notebook", ["final_notebook.ipynb"])
 def test_notebook_exec(notebook):
     """Ensure the notebook executes completely without errors."""
-    with open(notebook) as f:
-        nb = nbformat.read(f, as_version=4)
-        ep = ExecutePreprocessor(timeout=800, kernel_name="python3")
-        assert ep.preprocess(nb) is not None, f"Failed executing {notebook}"
+    kernel_namespace(notebook, REQUIRED_VARS, timeout=800)
 
 
 def get_namespace(path):
-    """Execute notebook cells and return global variable namespace."""
-    with open(path) as f:
-        nb = nbformat.read(f, as_version=4)
-    ns = {}
-    for cell in nb.cells:
-        if cell.cell_type == "code":
-            exec(cell.source, ns)
-    return ns
+    """Return the session-cached namespace for the notebook."""
+    return kernel_namespace(path, REQUIRED_VARS, timeout=800)
 
 
 def test_cross_validation_and_stratified():
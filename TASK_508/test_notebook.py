@@ -1,6 +1,5 @@
-import nbformat
 import pytest
-from nbconvert.preprocessors import ExecutePreprocessor
+from harness import kernel_namespace
 import numpy as np
 import pandas as pd
 import warnings
@@ -12,24 +11,21 @@ warnings.filterwarnings("ignore", category=UserWarning)
 warnings.filterwarnings("ignore", category=FutureWarning)
 
 
+REQUIRED_VARS = [
+    "kmeans_model", "inertia_value", "silhouette_avg", "davies_bouldin",
+    "cluster_summary", "df",
+]
+
+
 @pytest.mark.parametrize("notebook", ["final_notebook.ipynb"])
 def test_notebook_executes(notebook):
     """Ensure the notebook executes fully without errors."""
-    with open(notebook) as f:
-        nb = nbformat.read(f, as_version=4)
-        ep = ExecutePreprocessor(timeout=800, kernel_name="python3")
-        assert ep.preprocess(nb) is not None, f"Failed executing {notebook}"
+    kernel_namespace(notebook, REQUIRED_VARS, timeout=800)
 
 
 def get_namespace(path):
-    """Execute notebook cells and collect namespace."""
-    with open(path) as f:
-        nb = nbformat.read(f, as_version=4)
-    ns = {}
-    for cell in nb.cells:
-        if cell.cell_type == "code":
-            exec(cell.source, ns)
-    return ns
+    """Return the session-cached namespace for the notebook."""
+    return kernel_namespace(path, REQUIRED_VARS, timeout=800)
 
 
 def test_kmeans_variables_and_metrics():
@@ -1,33 +1,27 @@
-import nbformat
 import pytest
 import numpy as np
-from nbconvert.preprocessors import ExecutePreprocessor
+from harness import kernel_namespace
 from scipy.optimize import fsolve
 
 
+REQUIRED_VARS = [
+    "bisection_root", "newton_root", "bisection_error", "newton_error",
+    "convergence_data", "best_method", "bisection_batch", "newton_batch",
+    "brent_batch", "f_param", "fdf_param", "p_values", "batch_roots",
+    "bisection_trace", "newton_trace", "read_trace", "bisection_history",
+    "newton_history", "observed_orders",
+]
+
+
 @pytest.mark.parametrize("notebook", ["final_notebook.ipynb"])
 def test_notebook_exec(notebook):
     """Test that notebooks execute without errors."""
-    with open(notebook) as f:
-        nb = nbformat.read(f, as_version=4)
-        ep = ExecutePreprocessor(timeout=600, kernel_name="python3")
-        try:
-            assert ep.preprocess(nb) is not None, f"Got empty notebook for {notebook}"
-        except Exception:
-            assert False, f"Failed executing {notebook}"
+    kernel_namespace(notebook, REQUIRED_VARS)
 
 
 def get_notebook_namespace(notebook_path):
-    """Execute notebook cells and return namespace with all variables."""
-    with open(notebook_path) as f:
-        nb = nbformat.read(f, as_version=4)
-
-    namespace = {}
-    for cell in nb.cells:
-        if cell.cell_type == "code":
-            exec(cell.source, namespace)
-
-    return namespace
+    """Return the session-cached namespace for the notebook."""
+    return kernel_namespace(notebook_path, REQUIRED_VARS)
 
 
 def test_notebook_variables():
@@ -65,3 +59,82 @@ def test_notebook_variables():
     # Check best method
     assert ns["best_method"] in ["bisection", "newton"]
     assert ns["newton_error"] < ns["bisection_error"]
+
+
+def test_batched_root_finders():
+    """Vectorized bisection, Newton and Brent-style solvers agree on a parameter sweep."""
+    ns = get_notebook_namespace("final_notebook.ipynb")
+    p_values, roots = ns["p_values"], ns["batch_roots"]
+    f_param = ns["f_param"]
+    assert roots.shape == p_values.shape == (10**6,)
+    assert np.all((roots > 0) & (roots <= np.pi / 2))
+    assert np.max(np.abs(f_param(roots, p_values))) < 1e-12
+
+    p = p_values[::10000]
+    bis = ns["bisection_batch"](f_param, 0.0, np.pi / 2, args=(p,), tol=1e-12)
+    newton = ns["newton_batch"](ns["fdf_param"], 0.5, args=(p,), tol=1e-12)
+    brent = ns["brent_batch"](f_param, 0.0, np.pi / 2, args=(p,), tol=1e-12)
+    for res in [bis, newton, brent]:
+        assert res["converged"].all()
+        assert np.allclose(res["root"], roots[::10000], rtol=0, atol=1e-11)
+    assert brent["iterations"].max() < bis["iterations"].min()
+    for i in [0, 37, 99]:
+        assert np.isclose(brent["root"][i], fsolve(f_param, 0.5, args=(p[i],))[0], atol=1e-10)
+
+    # Scalar call reproduces the notebook loop; brackets without a sign change give nan
+    res = ns["bisection_batch"](lambda x: np.cos(x) - x / 2, 0.0, 2.0)
+    assert res["root"] == ns["bisection_root"]
+    res = ns["brent_batch"](lambda x, s: x**3 - s, -10.0, np.array([10.0, -5.0]),
+                            args=(np.array([2.0, 1.0]),), tol=1e-13)
+    assert np.isclose(res["root"][0], 2 ** (1 / 3)) and np.isnan(res["root"][1])
+    assert res["converged"].tolist() == [True, False]
+
+    # An exact zero at either endpoint is the root, for bisection as for brent
+    for solver in ["bisection_batch", "brent_batch"]:
+        res = ns[solver](lambda x: x, np.array([0.0, -1.0]), np.array([1.0, 0.0]))
+        assert res["root"].tolist() == [0.0, 0.0] and res["converged"].all()
+
+
+def test_single_pass_traces_match_reruns():
+    """Tolerances read off one traced run match fresh runs at each tolerance."""
+    ns = get_notebook_namespace("final_notebook.ipynb")
+    f = lambda x: np.cos(x) - x / 2
+    f_prime = lambda x: -np.sin(x) - 0.5
+
+    def bisection_rerun(tol):
+        a_bis, b_bis = 0, 2
+        for _ in range(50):
+            c = (a_bis + b_bis) / 2
+            if abs(f(c)) < tol:
+                break
+            if f(a_bis) * f(c) < 0:
+                b_bis = c
+            else:
+                a_bis = c
+        return c
+
+    def newton_rerun(tol):
+        x = 1.0
+        for _ in range(50):
+            fx = f(x)
+            if abs(fx) < tol:
+                break
+            x = x - fx / f_prime(x)
+        return x
+
+    tols = np.logspace(-1, -14, 60)
+    bis_hist = ns["bisection_trace"](f, 0, 2, tol=tols.min())
+    new_hist = ns["newton_trace"](f, f_prime, 1.0, tol=tols.min())
+    assert bis_hist.shape[1] == new_hist.shape[1] == 3
+    read = ns["read_trace"]
+    assert [bisection_rerun(t) for t in tols] == read(bis_hist, tols).tolist()
+    assert [newton_rerun(t) for t in tols] == read(new_hist, tols).tolist()
+
+    # The notebook's histories are the ones behind convergence_data
+    conv = ns["convergence_data"]
+    assert list(read(ns["bisection_history"], list(conv))) == [v[0] for v in conv.values()]
+    assert list(read(ns["newton_history"], list(conv))) == [v[1] for v in conv.values()]
+
+    orders = ns["observed_orders"]
+    assert np.isclose(orders["bisection"], 1.0)
+    assert 1.8 < orders["newton"] < 2.2
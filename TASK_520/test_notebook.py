@@ -1,32 +1,31 @@
-import nbformat
+import inspect
+
 import pytest
 import numpy as np
-from nbconvert.preprocessors import ExecutePreprocessor
+from harness import kernel_namespace
+
+
+REQUIRED_VARS = [
+    "ftcs_solution", "cn_solution", "ftcs_error", "cn_error",
+    "amplification_spectral_radius", "A_CN_condition_number",
+    "convergence_data", "observed_orders", "stability_ok", "stability_report",
+    "best_method", "run_cn", "run_ftcs", "ftcs_spectral_radius",
+    "laplacian_matrix_1d", "laplacian_sparse_1d", "laplacian_eigenvalues_1d",
+    "ftcs_stencil", "run_ftcs_batch", "initial_condition",
+    "convergence_study", "run_configs", "sweep_key", "sweep_cache",
+    "laplacian_sparse_2d", "run_ftcs_2d", "run_adi",
+]
 
 
 @pytest.mark.parametrize("notebook", ["final_notebook.ipynb"])
 def test_notebook_exec(notebook):
     """Test that notebooks execute without errors."""
-    with open(notebook) as f:
-        nb = nbformat.read(f, as_version=4)
-        ep = ExecutePreprocessor(timeout=600, kernel_name="python3")
-        try:
-            assert ep.preprocess(nb) is not None, f"Got empty notebook for {notebook}"
-        except Exception:
-            assert False, f"Failed executing {notebook}"
+    kernel_namespace(notebook, REQUIRED_VARS)
 
 
 def get_notebook_namespace(notebook_path):
-    """Execute notebook cells and return namespace with all variables."""
-    with open(notebook_path) as f:
-        nb = nbformat.read(f, as_version=4)
-
-    namespace = {}
-    for cell in nb.cells:
-        if cell.cell_type == "code":
-            exec(cell.source, namespace)
-
-    return namespace
+    """Return the session-cached namespace for the notebook."""
+    return kernel_namespace(notebook_path, REQUIRED_VARS)
 
 
 def test_notebook_variables():
@@ -103,3 +102,163 @@ def test_notebook_variables():
     # Best method selection
     assert ns["best_method"] in ["crank_nicolson", "ftcs"]
     assert ns["best_method"] == "crank_nicolson"
+
+
+def test_banded_cn_matches_dense_reference():
+    """Banded Cholesky CN reproduces the dense solve and np.linalg.cond."""
+    ns = get_notebook_namespace("final_notebook.ipynb")
+    run_cn = ns["run_cn"]
+    for N in [20, 80]:
+        u_dense, err_dense, cond_dense, _, _ = run_cn(N, 0.1, solver="dense")
+        u_band, err_band, cond_band, _, _ = run_cn(N, 0.1, solver="banded")
+        assert np.allclose(u_band, u_dense, rtol=1e-12, atol=1e-14)
+        assert np.isclose(err_band, err_dense, rtol=1e-9)
+        assert np.isclose(cond_band, cond_dense, rtol=1e-12)
+
+    # Large grids stay cheap: O(N) per step with a single factorization
+    u, err, cond, dx, dt = run_cn(20000, 0.1, r=2e5)
+    assert u.size == 20000 and np.isfinite(err) and err < 1e-4
+    assert cond > 1.0
+
+
+def test_structured_ftcs_spectral_radius():
+    """Analytic and Lanczos spectral radii agree with the dense eigensolve."""
+    ns = get_notebook_namespace("final_notebook.ipynb")
+    radius = ns["ftcs_spectral_radius"]
+    for N in [20, 80]:
+        for r in [0.4, 0.7]:
+            dense = radius(N, r, method="dense")
+            assert np.isclose(radius(N, r, method="analytic"), dense, rtol=1e-12)
+            assert np.isclose(radius(N, r, method="lanczos"), dense, rtol=1e-10)
+
+    T_dense = ns["laplacian_matrix_1d"](30)
+    assert np.array_equal(ns["laplacian_sparse_1d"](30).toarray(), T_dense)
+    assert np.allclose(np.sort(ns["laplacian_eigenvalues_1d"](30)), np.linalg.eigvalsh(T_dense))
+
+    # Sparse Lanczos scales past what a dense N x N eigensolve could hold
+    N = 200000
+    assert np.isclose(radius(N, 0.4, method="lanczos"), radius(N, 0.4), rtol=1e-12)
+    _, _, rho, _, _ = ns["run_ftcs"](80, 0.1, spectral="lanczos")
+    assert np.isclose(rho, ns["amplification_spectral_radius"], rtol=1e-12)
+
+
+def test_dst_jump_matches_stepwise():
+    """The DST-I jump-to-T mode reproduces both time-stepping loops."""
+    ns = get_notebook_namespace("final_notebook.ipynb")
+    for N in [20, 40, 80]:
+        u_loop, err_loop, rho_loop, _, _ = ns["run_ftcs"](N, 0.1)
+        u_dst, err_dst, rho_dst, _, _ = ns["run_ftcs"](N, 0.1, solver="dst")
+        assert np.allclose(u_dst, u_loop, rtol=0, atol=1e-13)
+        assert np.isclose(err_dst, err_loop, rtol=1e-6)
+        assert rho_dst == rho_loop
+
+        u_loop, err_loop, cond_loop, _, _ = ns["run_cn"](N, 0.1)
+        u_dst, err_dst, cond_dst, _, _ = ns["run_cn"](N, 0.1, solver="dst")
+        assert np.allclose(u_dst, u_loop, rtol=0, atol=1e-12)
+        assert np.isclose(err_dst, err_loop, rtol=1e-6)
+        assert cond_dst == cond_loop
+
+
+def test_batched_ftcs_kernel_matches_single_runs():
+    """The batched FTCS kernel matches per-row runs over initial data and alpha."""
+    ns = get_notebook_namespace("final_notebook.ipynb")
+    stencil = ns["ftcs_stencil"]
+    N, steps = 40, 500
+    U0 = np.random.default_rng(0).standard_normal((8, N))
+    r = np.linspace(0.1, 0.5, 8)
+    U = stencil(U0, r, steps)
+    assert U.shape == U0.shape
+    for b in range(8):
+        assert np.array_equal(U[b], stencil(U0[b], r[b], steps))
+
+    alphas = np.array([0.5, 1.0, 2.0])
+    U, errors, dx, dt = ns["run_ftcs_batch"](N, 0.1, alphas=alphas)
+    assert np.isclose(dt, 0.4 * dx**2 / 2.0)
+    assert errors.shape == (3,) and np.all(errors < 1e-3)
+    # Row with alpha = 1 at r = 0.2 is still consistent with run_ftcs at r = 0.4
+    u_ref, err_ref, _, _, _ = ns["run_ftcs"](N, 0.1)
+    assert np.allclose(U[1], u_ref, atol=5e-4)
+
+    x = np.linspace(dx, 1 - dx, N)
+    U, errors, _, _ = ns["run_ftcs_batch"](N, 0.1, u0=np.tile(ns["initial_condition"](x), (2, 1)))
+    assert errors is None and U.shape == (2, N)
+
+    # A single 1-D profile is one row, or is shared by every row of alphas
+    U1, _, _, _ = ns["run_ftcs_batch"](N, 0.1, u0=ns["initial_condition"](x))
+    assert U1.shape == (1, N) and np.array_equal(U1[0], U[0])
+    U3, _, _, _ = ns["run_ftcs_batch"](N, 0.1, u0=ns["initial_condition"](x), alphas=alphas)
+    assert U3.shape == (3, N)
+
+    # A scalar diffusivity is the same as a one-element list
+    U_scalar, err_scalar, _, dt_scalar = ns["run_ftcs_batch"](N, 0.1, alphas=2.0)
+    U_list, err_list, _, dt_list = ns["run_ftcs_batch"](N, 0.1, alphas=[2.0])
+    assert U_scalar.shape == (1, N) and dt_scalar == dt_list
+    assert np.array_equal(U_scalar, U_list) and np.array_equal(err_scalar, err_list)
+
+
+def test_parallel_sweep_matches_serial_and_reuses_results():
+    """The process-pool refinement sweep matches direct runs and reuses cached runs."""
+    ns = get_notebook_namespace("final_notebook.ipynb")
+    study = ns["convergence_study"]
+
+    data, orders, report = study([20, 40, 80])
+    assert data == ns["convergence_data"]
+    assert orders == ns["observed_orders"]
+    assert report == ns["stability_report"]
+
+    Ns = [40, 80, 160]
+    data, orders, report = study(Ns, r=0.3, workers=2)
+    for N in Ns:
+        assert data[N][0] == ns["run_ftcs"](N, 0.1, r=0.3)[1]
+        assert data[N][1] == ns["run_cn"](N, 0.1, r=0.3)[1]
+    assert set(orders) == {(40, 80), (80, 160)}
+    assert all(1.8 < p < 2.2 for p in orders.values())
+    assert np.isclose(report["r"], 0.3) and report["ftcs_stable"]
+
+    # The notebook run leaves one cached entry per (method, N) of the study
+    assert len(ns["sweep_cache"]) == 6
+
+    # Cached configurations are returned without re-running the solver
+    run_configs = ns["run_configs"]
+    cache = run_configs.__globals__["sweep_cache"]
+    key = ns["sweep_key"]("cn", 160, 0.3)
+    result = run_configs([key], workers=2)[0]
+    assert key in cache and result[1] == data[160][1]
+    cache[key] = "cached"
+    assert run_configs([key], workers=2) == ["cached"]
+
+    # Serial unless a caller opts in to process fan-out
+    for fn in (study, run_configs):
+        assert inspect.signature(fn).parameters["workers"].default == 1
+
+
+def test_2d_heat_solvers():
+    """2D FTCS and ADI converge on the unit square using Kronecker-sum operators."""
+    ns = get_notebook_namespace("final_notebook.ipynb")
+    N = 6
+    T_dense = ns["laplacian_matrix_1d"](N)
+    I = np.eye(N)
+    L2 = ns["laplacian_sparse_2d"](N)
+    assert L2.nnz == 5 * N * N - 4 * N
+    assert np.array_equal(L2.toarray(), np.kron(I, T_dense) + np.kron(T_dense, I))
+
+    ftcs_errors, adi_errors = [], []
+    for N in [20, 40]:
+        u, err, rho, _, _ = ns["run_ftcs_2d"](N, 0.1)
+        u_sparse, err_sparse, _, _, _ = ns["run_ftcs_2d"](N, 0.1, solver="sparse")
+        assert u.shape == (N, N) and rho < 1.0
+        assert np.allclose(u, u_sparse, rtol=0, atol=1e-14)
+        ftcs_errors.append(err)
+
+        u, err, cond, _, _ = ns["run_adi"](N, 0.1, r=2.0)
+        assert u.shape == (N, N) and cond > 1.0
+        adi_errors.append(err)
+
+    assert 1.8 < np.log2(ftcs_errors[0] / ftcs_errors[1]) < 2.2
+    assert 1.8 < np.log2(adi_errors[0] / adi_errors[1]) < 2.2
+
+    # ADI stays stable far beyond the explicit limit r <= 1/4
+    _, err, _, _, _ = ns["run_adi"](40, 0.1, r=10.0)
+    assert np.isfinite(err) and err < 1e-3
+    with pytest.raises(ValueError):
+        ns["run_ftcs_2d"](10, 0.1, solver="dense")
@@ -1,25 +1,25 @@
-import nbformat
 import pytest
 import numpy as np
-from nbconvert.preprocessors import ExecutePreprocessor
+from harness import kernel_namespace
+
+REQUIRED_VARS = [
+    "rk4_solution", "symplectic_solution", "rk4_error", "symplectic_error",
+    "invariant_drift_rk4", "invariant_drift_symplectic", "convergence_data",
+    "observed_orders", "fixed_point", "jacobian_eigs", "is_center",
+    "best_method", "final_point", "iterations", "multistart_descent",
+    "multistart", "minima", "minimize", "trajectory", "optimization_report",
+    "gradient", "hessian", "stability_map", "stability", "critical_points",
+    "critical_types",
+]
 
 @pytest.mark.parametrize("notebook", ["final_notebook.ipynb"])
 def test_notebook_exec(notebook):
     """Ensure the notebook executes successfully."""
-    with open(notebook) as f:
-        nb = nbformat.read(f, as_version=4)
-        ep = ExecutePreprocessor(timeout=900, kernel_name="python3")
-        ep.preprocess(nb)
+    kernel_namespace(notebook, REQUIRED_VARS, timeout=900)
 
 def get_notebook_namespace(path):
-    """Execute notebook and collect global variables."""
-    with open(path) as f:
-        nb = nbformat.read(f, as_version=4)
-    ns = {}
-    for cell in nb.cells:
-        if cell.cell_type == "code":
-            exec(cell.source, ns)
-    return ns
+    """Return the session-cached namespace for the notebook."""
+    return kernel_namespace(path, REQUIRED_VARS, timeout=900)
 
 def test_notebook_variables():
     ns = get_notebook_namespace("final_notebook.ipynb")
@@ -75,3 +75,81 @@ def test_notebook_variables():
     # Best method
     assert ns["best_method"] in ["rk4", "symplectic"]
     assert ns["best_method"] == "rk4"
+
+HIMMELBLAU_MINIMA = np.array([
+    [-3.779310, -3.283186],
+    [-2.805118, 3.131312],
+    [3.0, 2.0],
+    [3.584428, -1.848127],
+])
+
+def test_multistart_descent_finds_every_basin():
+    """Vectorized multi-start descent finds all four minima and matches the single run."""
+    ns = get_notebook_namespace("final_notebook.ipynb")
+    ms = ns["multistart"]
+    M = len(ms["final_point"])
+    assert ms["final_value"].shape == ms["iterations"].shape == (M,)
+    assert ms["converged"].all()
+    assert np.allclose(ns["minima"], HIMMELBLAU_MINIMA, atol=1e-5)
+    assert set(np.unique(ms["basin"])) == {0, 1, 2, 3}
+    assert np.all(ms["final_value"] < 1e-10)
+
+    single = ns["multistart_descent"](np.array([[0.0, 0.0], [0.1, -4.0]]))
+    assert np.array_equal(single["final_point"][0], ns["final_point"])
+    assert single["iterations"][0] == ns["iterations"]
+    assert np.allclose(single["minima"][single["basin"][1]], HIMMELBLAU_MINIMA[3], atol=1e-5)
+
+def test_second_order_modes_converge_in_few_iterations():
+    """Trust-region Newton and L-BFGS reach a minimum in tens of iterations."""
+    ns = get_notebook_namespace("final_notebook.ipynb")
+    traj = ns["trajectory"]
+    assert isinstance(traj, np.ndarray) and traj.shape == (ns["iterations"], 2)
+
+    report = ns["optimization_report"]
+    assert set(report["method_iterations"]) == {"gd", "newton", "lbfgs"}
+    assert set(report["method_wall_time_s"]) == {"gd", "newton", "lbfgs"}
+    assert report["method_iterations"]["gd"] == ns["iterations"]
+    assert max(report["method_iterations"]["newton"], report["method_iterations"]["lbfgs"]) < 50
+
+    rng = np.random.default_rng(0)
+    for x0 in rng.uniform(-5.0, 5.0, size=(20, 2)):
+        for method in ["newton", "lbfgs"]:
+            traj = ns["minimize"](x0, method=method)
+            p = traj[-1]
+            assert len(traj) < 100
+            assert np.linalg.norm(ns["gradient"](*p)) < 1e-6
+            assert np.min(np.abs(HIMMELBLAU_MINIMA - p).max(axis=1)) < 1e-5
+    with pytest.raises(ValueError):
+        ns["minimize"]([0.0, 0.0], method="cg")
+
+def test_grid_stability_map_classifies_critical_points():
+    """The batched grid analysis finds all nine critical points and tiles consistently."""
+    ns = get_notebook_namespace("final_notebook.ipynb")
+    points, types = ns["critical_points"], ns["critical_types"]
+    assert len(points) == 9
+    assert types.count("minimum") == 4 and types.count("maximum") == 1 and types.count("saddle") == 4
+    found_minima = points[[t == "minimum" for t in types]]
+    assert np.allclose(found_minima, HIMMELBLAU_MINIMA, atol=1e-5)
+    maximum = points[types.index("maximum")]
+    assert np.allclose(maximum, [-0.270845, -0.923039], atol=1e-5)
+
+    st = ns["stability"]
+    assert st["gradient_check_max"] < 1e-6 and st["hessian_check_max"] < 1e-6
+    assert st["V"].shape == st["lambda_min"].shape == (401, 401)
+    assert np.all(st["lambda_min"] <= st["lambda_max"])
+
+    # Eigenvalues match a batched dense eigensolve; tiling does not change results
+    xs = np.linspace(-4.0, 4.0, 61)
+    full = ns["stability_map"](xs, xs)
+    tiled = ns["stability_map"](xs, xs, tile_rows=7)
+    X, Y = np.meshgrid(xs, xs)
+    H = np.moveaxis(ns["hessian"](X, Y), (0, 1), (-2, -1))
+    eigs = np.linalg.eigvalsh(H)
+    assert np.allclose(full["lambda_min"], eigs[..., 0], atol=1e-10)
+    assert np.allclose(full["lambda_max"], eigs[..., 1], atol=1e-10)
+    for key in ["V", "lambda_min", "curvature", "gradient_check_error"]:
+        assert np.array_equal(tiled[key], full[key])
+    assert np.array_equal(tiled["critical_points"], full["critical_points"])
+
+    summary = ns["stability_map"](xs, xs, tile_rows=5, maps=False)
+    assert "V" not in summary and summary["curvature_counts"] == full["curvature_counts"]
@@ -1,25 +1,17 @@
-import nbformat
 import pytest
-from nbconvert.preprocessors import ExecutePreprocessor
+from harness import kernel_namespace
 import pandas as pd
 import json
 import os
 
+REQUIRED_VARS = ["validate_and_export_inventory", "result"]
+
 @pytest.mark.parametrize("notebook", ["final_notebook.ipynb"])
 def test_notebook_exec(notebook):
-    with open(notebook) as f:
-        nb = nbformat.read(f, as_version=4)
-    ep = ExecutePreprocessor(timeout=600, kernel_name="python3")
-    assert ep.preprocess(nb) is not None
+    kernel_namespace(notebook, REQUIRED_VARS)
 
 def get_ns(path):
-    with open(path) as f:
-        nb = nbformat.read(f, as_version=4)
-    ns = {}
-    for cell in nb.cells:
-        if cell.cell_type == "code":
-            exec(cell.source, ns)
-    return ns
+    return kernel_namespace(path, REQUIRED_VARS)
 
 def test_returns_and_files():
     ns = get_ns("final_notebook.ipynb")
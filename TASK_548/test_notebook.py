@@ -1,26 +1,22 @@
-import nbformat
 import pytest
 import numpy as np
-from nbconvert.preprocessors import ExecutePreprocessor
+from harness import kernel_namespace
+
+REQUIRED_VARS = [
+    "cv_scores", "cv_mean_score", "cv_std_score", "stratified_cv_scores",
+    "stratified_cv_mean", "stratified_cv_std", "cv_f1_scores", "cv_f1_mean",
+    "cv_roc_auc_scores", "cv_roc_auc_mean",
+]
 
 @pytest.mark.parametrize("notebook", ["final_notebook.ipynb"])
 def test_notebook_exec(notebook):
-    with open(notebook) as f:
-        nb = nbformat.read(f, as_version=4)
-        ep = ExecutePreprocessor(timeout=600, kernel_name="python3")
-        assert ep.preprocess(nb) is not None
+    kernel_namespace(notebook, REQUIRED_VARS)
 
-def test_notebook_variables(path):
-    with open(path) as f:
-        nb = nbformat.read(f, as_version=4)
-    ns = {}
-    for cell in nb.cells:
-        if cell.cell_type == "code":
-            exec(cell.source, ns)
-    return ns
+def get_notebook_namespace(path):
+    return kernel_namespace(path, REQUIRED_VARS)
 
 def test_notebook_variables():
-    ns = test_notebook_variables("final_notebook.ipynb")
+    ns = get_notebook_namespace("final_notebook.ipynb")
     for var in ["cv_scores","cv_mean_score","cv_std_score","stratified_cv_scores",
                 "stratified_cv_mean","stratified_cv_std","cv_f1_scores","cv_f1_mean",
                 "cv_roc_auc_scores","cv_roc_auc_mean"]:
@@ -0,0 +1,32 @@
+"""Shared execution harness for the TASK_* notebook test suites."""
+from harness.codecache import CompiledCell, load_cells
+from harness.incremental import IncrementalRunner
+from harness.kernel import execute_in_kernel
+from harness.namespace import (
+    NamespaceView,
+    clear_cache,
+    code_cells,
+    code_hash,
+    execute_cells,
+    kernel_namespace,
+    load_namespace,
+)
+from harness.pool import KernelPool
+from harness.profile import CellProfiler, profile_notebook
+
+__all__ = [
+    "CellProfiler",
+    "CompiledCell",
+    "IncrementalRunner",
+    "KernelPool",
+    "NamespaceView",
+    "clear_cache",
+    "code_cells",
+    "code_hash",
+    "execute_cells",
+    "execute_in_kernel",
+    "kernel_namespace",
+    "load_cells",
+    "load_namespace",
+    "profile_notebook",
+]
@@ -0,0 +1,238 @@
+"""Benchmark every task notebook against a stored baseline.
+
+Each ``final_notebook.ipynb`` (and ``initial_notebook.ipynb`` where the
+folder has one) runs ``--warmup`` + ``-n`` times, each time in a fresh
+interpreter inside a scratch copy of its task folder. The median and p95
+wall time and the peak RSS are recorded per notebook. ``--save-baseline``
+stores them in a versioned JSON file; later runs are compared against it
+and fail when a notebook regresses past ``--threshold`` (slowdowns under
+``--min-time-delta`` seconds are noise), fails to run without having failed
+in the baseline too, or is in the baseline but did not run::
+
+    python -m harness.bench --save-baseline          # record
+    python -m harness.bench                          # gate against it
+    python -m harness.bench TASK_520 TASK_239 -n 10 --threshold 0.1
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from harness.runner import REPO_ROOT
+
+
+BASELINE_VERSION = 1
+DEFAULT_BASELINE = os.path.join(REPO_ROOT, "benchmarks", "baseline.json")
+NOTEBOOKS = ("final_notebook.ipynb", "initial_notebook.ipynb")
+
+CHILD = """\
+import json, resource, sys, time
+from harness.namespace import code_cells, execute_cells
+sources = code_cells(sys.argv[1])
+start = time.perf_counter()
+execute_cells(sources)
+wall = time.perf_counter() - start
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == "darwin":
+    rss //= 1024
+with open(sys.argv[2], "w") as f:
+    json.dump({"wall_s": wall, "peak_rss_kb": rss}, f)
+"""
+
+
+def discover_notebooks(root=REPO_ROOT, tasks=None):
+    """Return ``(task_dir, notebook_name)`` pairs to benchmark."""
+    if tasks:
+        dirs = [os.path.abspath(t) for t in tasks]
+    else:
+        dirs = [os.path.join(root, n) for n in sorted(os.listdir(root))]
+        dirs = [d for d in dirs if os.path.isfile(os.path.join(d, NOTEBOOKS[0]))]
+    return [(d, nb) for d in dirs for nb in NOTEBOOKS if os.path.isfile(os.path.join(d, nb))]
+
+
+def run_once(workdir, notebook, timeout):
+    """Execute one notebook in a fresh interpreter and return its measurements."""
+    fd, out = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    env = dict(os.environ, MPLBACKEND="Agg")
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (REPO_ROOT, env.get("PYTHONPATH")) if p)
+    try:
+        proc = subprocess.run(
+            [sys.executable, "-c", CHILD, notebook, out],
+            cwd=workdir, env=env, capture_output=True, text=True, timeout=timeout,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed")
+        with open(out) as f:
+            return json.load(f)
+    finally:
+        os.remove(out)
+
+
+def p95(values):
+    """Nearest-rank 95th percentile."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(0.95 * len(ordered)) - 1, 0)]
+
+
+def bench_notebook(task_dir, notebook, runs=5, warmup=1, timeout=1800):
+    """Benchmark one notebook and return its summary row."""
+    key = f"{os.path.basename(task_dir)}/{notebook}"
+    scratch = tempfile.mkdtemp(prefix="bench-")
+    workdir = os.path.join(scratch, os.path.basename(task_dir))
+    shutil.copytree(task_dir, workdir, ignore=shutil.ignore_patterns("__pycache__", ".pytest_cache"))
+    try:
+        samples = []
+        for i in range(warmup + runs):
+            sample = run_once(workdir, notebook, timeout)
+            if i >= warmup:
+                samples.append(sample)
+    except (RuntimeError, subprocess.TimeoutExpired) as e:
+        return {"notebook": key, "error": str(e)}
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    walls = [s["wall_s"] for s in samples]
+    return {
+        "notebook": key,
+        "runs": runs,
+        "median_s": round(statistics.median(walls), 4),
+        "p95_s": round(p95(walls), 4),
+        "peak_rss_mb": round(max(s["peak_rss_kb"] for s in samples) / 1024, 1),
+    }
+
+
+def load_baseline(path):
+    with open(path) as f:
+        baseline = json.load(f)
+    if baseline.get("version") != BASELINE_VERSION:
+        raise ValueError(
+            f"{path} has baseline version {baseline.get('version')}, expected {BASELINE_VERSION}; "
+            "re-record it with --save-baseline"
+        )
+    return baseline
+
+
+def save_baseline(rows, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    baseline = {
+        "version": BASELINE_VERSION,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        # Error rows are kept so that a notebook which is meant to fail (the
+        # broken initial_notebook starters) does not fail the gate later on
+        "results": {r["notebook"]: r for r in rows},
+    }
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare(rows, baseline, threshold=0.2, memory_threshold=0.2, scope=None, min_time_delta=0.05):
+    """Annotate rows with their baseline ratio and a status.
+
+    Status is ``regressed`` when the median wall time or the peak RSS grew
+    by more than the threshold fraction, ``new`` when the notebook has no
+    timing baseline, ``error`` when it failed to run, ``expected-error``
+    when it also failed in the baseline, and ``ok`` otherwise. A slowdown
+    of less than ``min_time_delta`` seconds never counts, so millisecond
+    notebooks are not failed by timer noise. Baseline entries that did not
+    run are appended as ``missing`` rows; ``scope`` (a predicate on the
+    notebook key) limits that check to the notebooks a partial run was
+    asked to cover.
+    """
+    known = baseline["results"] if baseline else {}
+    ran = {row["notebook"] for row in rows}
+    for row in rows:
+        base = known.get(row["notebook"])
+        if "error" in row:
+            row["status"] = "expected-error" if base is not None and "error" in base else "error"
+        elif base is None or "error" in base:
+            row["status"] = "new"
+        else:
+            # Medians are stored to 0.1 ms; a faster baseline rounds to zero
+            row["time_ratio"] = round(row["median_s"] / max(base["median_s"], 1e-4), 3)
+            row["rss_ratio"] = round(row["peak_rss_mb"] / base["peak_rss_mb"], 3)
+            slower = (row["time_ratio"] > 1 + threshold
+                      and row["median_s"] - base["median_s"] > min_time_delta)
+            bigger = row["rss_ratio"] > 1 + memory_threshold
+            row["status"] = "regressed" if slower or bigger else "ok"
+    for name in sorted(known):
+        if name not in ran and (scope is None or scope(name)):
+            rows.append({"notebook": name, "status": "missing"})
+    return rows
+
+
+def format_rows(rows):
+    lines = [f"{'notebook':<38} {'median':>8} {'p95':>8} {'rss MB':>8} {'x time':>7} {'x rss':>6}  status"]
+    for r in rows:
+        if "error" in r:
+            label = "expected error" if r.get("status") == "expected-error" else "error"
+            lines.append(f"{r['notebook']:<38} {'':>8} {'':>8} {'':>8} {'':>7} {'':>6}  {label}: {r['error']}")
+            continue
+        if r.get("status") == "missing":
+            lines.append(f"{r['notebook']:<38} {'':>8} {'':>8} {'':>8} {'':>7} {'':>6}  missing: in baseline, did not run")
+            continue
+        lines.append(
+            f"{r['notebook']:<38} {r['median_s']:>7.3f}s {r['p95_s']:>7.3f}s {r['peak_rss_mb']:>8.1f} "
+            f"{r.get('time_ratio', ''):>7} {r.get('rss_ratio', ''):>6}  {r.get('status', '')}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark task notebooks against a baseline.")
+    parser.add_argument("tasks", nargs="*", help="task folders (default: all with a final notebook)")
+    parser.add_argument("-n", "--runs", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--timeout", type=int, default=1800, help="per-run timeout in seconds")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="record results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed median wall-time growth")
+    parser.add_argument("--memory-threshold", type=float, default=0.2, help="allowed peak RSS growth")
+    parser.add_argument("--min-time-delta", type=float, default=0.05,
+                        help="ignore median slowdowns smaller than this many seconds")
+    parser.add_argument("--final-only", action="store_true", help="skip initial notebooks")
+    args = parser.parse_args(argv)
+
+    pairs = discover_notebooks(tasks=args.tasks)
+    if args.final_only:
+        pairs = [p for p in pairs if p[1] == NOTEBOOKS[0]]
+    rows = [bench_notebook(d, nb, args.runs, args.warmup, args.timeout) for d, nb in pairs]
+
+    if args.save_baseline:
+        save_baseline(rows, args.baseline)
+        print(format_rows(rows))
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline) if os.path.exists(args.baseline) else None
+    selected = {os.path.basename(os.path.abspath(t)) for t in args.tasks}
+
+    def scope(name):
+        task, notebook = name.split("/", 1)
+        if selected and task not in selected:
+            return False
+        return not args.final_only or notebook == NOTEBOOKS[0]
+
+    compare(rows, baseline, args.threshold, args.memory_threshold, scope, args.min_time_delta)
+    print(format_rows(rows))
+    failed = False
+    for status, message in [
+        ("error", "failed to run"),
+        ("missing", "in the baseline did not run"),
+        ("regressed", "regressed past the threshold"),
+    ]:
+        names = [r["notebook"] for r in rows if r["status"] == status]
+        if names:
+            print(f"{len(names)} notebook(s) {message}: {', '.join(names)}")
+            failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
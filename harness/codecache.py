@@ -0,0 +1,168 @@
+"""Persistent cache of compiled notebook cells.
+
+``load_cells`` turns a notebook into a list of ``CompiledCell`` objects.
+Each code cell is compiled once and its bytecode is written with
+``marshal`` to ``<cache_dir>/<sha256>.<cache_tag>.bin``, so the entry is
+keyed by the cell source and the interpreter that compiled it. A small
+index keyed by the hash of the notebook file's bytes maps a notebook to
+its cell hashes, so an unchanged notebook, including a scratch copy of it
+in another directory, is loaded without parsing its JSON or compiling
+anything, and copies never leave entries behind that cannot be hit again.
+
+Cells that are not plain Python (IPython magics such as ``%matplotlib``
+or ``!pip``) do not compile; they are kept with ``code=None`` and run from
+their source, so the error, if any, surfaces where the cell is executed.
+``read_sources`` returns the raw sources without compiling at all, for
+callers that hand them to a kernel.
+
+Compiled cells carry the filename ``<notebook PATH cell N>`` and the
+source is registered with ``linecache``, so tracebacks point at the right
+notebook, cell and cell-relative line.
+"""
+import hashlib
+import importlib.util
+import json
+import linecache
+import marshal
+import os
+import sys
+import tempfile
+from collections import namedtuple
+
+import nbformat
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_TAG = f"{sys.implementation.cache_tag}-{importlib.util.MAGIC_NUMBER.hex()}"
+
+CompiledCell = namedtuple("CompiledCell", ["index", "digest", "source", "code"])
+
+_MEMO = {}
+_SOURCE_MEMO = {}
+
+
+def default_cache_dir():
+    """``$HARNESS_CACHE_DIR`` if set, else ``.harness_cache`` in the repo root."""
+    return os.environ.get("HARNESS_CACHE_DIR") or os.path.join(REPO_ROOT, ".harness_cache")
+
+
+def cell_digest(source):
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+def cell_filename(path, index):
+    return f"<notebook {path} cell {index}>"
+
+
+def retarget(code, filename):
+    """Return ``code`` with ``co_filename`` replaced in it and all nested code."""
+    consts = tuple(
+        retarget(c, filename) if isinstance(c, type(code)) else c for c in code.co_consts
+    )
+    return code.replace(co_filename=filename, co_consts=consts)
+
+
+def _write_atomic(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _file_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _index_path(cache_dir, key):
+    return os.path.join(cache_dir, "index", key + ".json")
+
+
+def _read_index(cache_dir, key):
+    try:
+        with open(_index_path(cache_dir, key)) as f:
+            return json.load(f)["cells"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _write_index(cache_dir, key, digests):
+    os.makedirs(os.path.join(cache_dir, "index"), exist_ok=True)
+    _write_atomic(_index_path(cache_dir, key), json.dumps({"cells": digests}).encode("utf-8"))
+
+
+def _read_code(cache_dir, digest):
+    try:
+        with open(os.path.join(cache_dir, f"{digest}.{CACHE_TAG}.bin"), "rb") as f:
+            return marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+
+
+def _write_code(cache_dir, digest, source, code):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{digest}.{CACHE_TAG}.bin")
+    _write_atomic(path, marshal.dumps((source, code)))
+
+
+def _parse(path):
+    with open(path, encoding="utf-8") as f:
+        nb = nbformat.read(f, as_version=4)
+    return [cell.source for cell in nb.cells if cell.cell_type == "code"]
+
+
+def read_sources(path):
+    """Return the source of every code cell, without compiling anything."""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    memo_key = (path, stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _SOURCE_MEMO:
+        _SOURCE_MEMO[memo_key] = _parse(path)
+    return _SOURCE_MEMO[memo_key]
+
+
+def load_cells(path, cache_dir=None):
+    """Return the notebook's code cells compiled, using the on-disk cache.
+
+    Pass ``cache_dir=False`` to compile without touching the disk cache.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    memo_key = (path, stat.st_size, stat.st_mtime_ns)
+    if memo_key in _MEMO:
+        return _MEMO[memo_key]
+
+    cache_dir = default_cache_dir() if cache_dir is None else cache_dir
+    entries = None
+    key = _file_digest(path) if cache_dir else None
+    digests = _read_index(cache_dir, key) if cache_dir else None
+    if digests is not None:
+        entries = [_read_code(cache_dir, d) for d in digests]
+        if any(e is None for e in entries):
+            entries = None
+
+    if entries is None:
+        sources = _parse(path)
+        digests = [cell_digest(src) for src in sources]
+        entries = []
+        for digest, src in zip(digests, sources):
+            cached = _read_code(cache_dir, digest) if cache_dir else None
+            if cached is None:
+                try:
+                    code = compile(src, f"<cell {digest[:12]}>", "exec")
+                except SyntaxError:
+                    code = None
+                cached = (src, code)
+                if cache_dir:
+                    _write_code(cache_dir, digest, *cached)
+            entries.append(cached)
+        if cache_dir:
+            _write_index(cache_dir, key, digests)
+
+    cells = []
+    for index, (digest, (source, code)) in enumerate(zip(digests, entries)):
+        filename = cell_filename(path, index)
+        linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
+        cells.append(CompiledCell(index, digest, source, code and retarget(code, filename)))
+    _MEMO[memo_key] = cells
+    return cells
@@ -0,0 +1,244 @@
+"""Incremental notebook re-execution driven by a cell dependency graph.
+
+``IncrementalRunner`` keeps one namespace alive across runs of the same
+notebook. Every cell is analysed statically for the global names it reads
+and writes, which gives a dataflow graph: a cell depends on the most
+recent earlier cell that writes each name it reads. After a cell runs, the
+names it (re)bound, deleted or mutated are deep-copied into a per-cell
+snapshot.
+
+On the next run only cells whose source changed, whose inputs now come
+from different cells, or that sit downstream of such a cell are executed;
+every other cell is skipped and its snapshot restored instead. Editing the
+``predict_proba`` cell of TASK_243 therefore re-runs that cell alone and
+keeps the fitted RandomForest::
+
+    runner = IncrementalRunner()
+    runner.run_notebook("TASK_243/final_notebook.ipynb")   # runs all cells
+    ...edit cell 5...
+    runner.run_notebook("TASK_243/final_notebook.ipynb")   # -> [4]
+
+In-place mutation is tracked for subscript/attribute assignment
+(``df["c"] = ...``) and statement-level method calls (``model.fit(...)``);
+mutation hidden inside other function calls is not. Cells that use
+``globals()``, ``exec``/``eval`` or star imports are treated as reading
+and writing everything.
+
+The global random state (``random`` and ``numpy.random``) is treated as one
+implicit variable: every cell that refers to ``random`` or ``*.random``
+reads and writes it, so editing a cell that draws numbers re-runs every
+later cell that draws, and each snapshot records the state the cell left
+behind, so a re-run starts from the same state as in a full run. Draws
+through names imported from ``numpy.random`` are not tracked.
+"""
+import ast
+import builtins
+import copy
+import random
+import sys
+
+from harness.codecache import CompiledCell, cell_digest, load_cells
+
+
+_DELETED = object()
+_RNG = "<random state>"  # not an identifier, so it cannot clash with a global
+_OPAQUE_CALLS = {"globals", "exec", "eval", "vars", "locals"}
+
+
+class CellInfo:
+    """Global names a cell reads and writes, from its syntax tree."""
+
+    def __init__(self, source):
+        self.reads = set()
+        self.writes = set()
+        self.mutates = set()
+        self.opaque = False
+        tree = ast.parse(source)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load):
+                self.reads.add(node.id)
+                if node.id in _OPAQUE_CALLS:
+                    self.opaque = True
+                if node.id == "random":
+                    self.reads.add(_RNG)
+            elif isinstance(node, ast.Attribute) and node.attr == "random":
+                self.reads.add(_RNG)
+            elif isinstance(node, ast.ImportFrom) and any(a.name == "*" for a in node.names):
+                self.opaque = True
+        for stmt in tree.body:
+            self._visit_top(stmt)
+        self.reads -= set(dir(builtins)) - self.writes
+        if _RNG in self.reads:
+            self.writes.add(_RNG)
+
+    def _visit_top(self, stmt):
+        for node in _top_level_nodes(stmt):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                self.writes.add(node.name)
+            elif isinstance(node, (ast.Import, ast.ImportFrom)):
+                for alias in node.names:
+                    self.writes.add((alias.asname or alias.name).split(".")[0])
+            elif isinstance(node, ast.Name) and isinstance(node.ctx, (ast.Store, ast.Del)):
+                self.writes.add(node.id)
+            elif isinstance(node, (ast.Subscript, ast.Attribute)) and isinstance(node.ctx, (ast.Store, ast.Del)):
+                base = _base_name(node)
+                if base:
+                    self.mutates.add(base)
+            elif isinstance(node, ast.Expr) and isinstance(node.value, ast.Call):
+                func = node.value.func
+                if isinstance(func, ast.Attribute):
+                    base = _base_name(func)
+                    if base:
+                        self.mutates.add(base)
+
+    @property
+    def outputs(self):
+        return self.writes | self.mutates
+
+
+def _top_level_nodes(stmt):
+    """Walk a statement without entering function, class, lambda or comprehension scopes."""
+    stack = [stmt]
+    scoped = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda,
+              ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+    while stack:
+        node = stack.pop()
+        yield node
+        if isinstance(node, scoped):
+            continue
+        stack.extend(ast.iter_child_nodes(node))
+
+
+def _base_name(node):
+    while isinstance(node, (ast.Subscript, ast.Attribute)):
+        node = node.value
+    return node.id if isinstance(node, ast.Name) else None
+
+
+def dependency_graph(infos):
+    """Return, for each cell, the set of earlier cells it reads from."""
+    deps = []
+    for j, info in enumerate(infos):
+        if info.opaque:
+            deps.append(set(range(j)))
+            continue
+        found = set()
+        for name in info.reads | info.mutates:
+            for i in range(j - 1, -1, -1):
+                if name in infos[i].outputs or infos[i].opaque:
+                    found.add(i)
+                    break
+        deps.append(found)
+    return deps
+
+
+class IncrementalRunner:
+    """Re-execute only the cells affected by an edit.
+
+    ``executed`` holds the indices run by the last call to ``run``.
+    """
+
+    def __init__(self):
+        self.ns = {}
+        self.digests = []
+        self.deps = []
+        self.snapshots = []
+        self.executed = []
+
+    def plan(self, cells):
+        """Return the cell indices ``run`` would execute for these cells."""
+        digests, deps = self._analyse(cells)
+        return sorted(self._rerun_set(digests, deps))
+
+    def run(self, cells):
+        """Bring the namespace up to date with ``cells`` and return executed indices.
+
+        ``cells`` holds source strings or ``CompiledCell`` objects.
+        """
+        digests, deps = self._analyse(cells)
+        rerun = self._rerun_set(digests, deps)
+        first = min(rerun) if rerun else len(cells)
+
+        self.ns.clear()
+        for snap in self.snapshots[:first]:
+            self._restore(snap)
+        snapshots = self.snapshots[:first]
+        for j in range(first, len(cells)):
+            if j in rerun:
+                snapshots.append(self._execute(cells[j]))
+            else:
+                self._restore(self.snapshots[j])
+                snapshots.append(self.snapshots[j])
+        self.digests, self.deps, self.snapshots = digests, deps, snapshots
+        self.executed = sorted(rerun)
+        return self.executed
+
+    def run_notebook(self, path):
+        return self.run(load_cells(path))
+
+    def _analyse(self, cells):
+        sources = [c.source if isinstance(c, CompiledCell) else c for c in cells]
+        digests = [cell_digest(src) for src in sources]
+        return digests, dependency_graph([CellInfo(src) for src in sources])
+
+    def _rerun_set(self, digests, deps):
+        rerun = set()
+        for j, digest in enumerate(digests):
+            unchanged = (
+                j < len(self.digests)
+                and self.digests[j] == digest
+                and self.deps[j] == deps[j]
+            )
+            if not unchanged or deps[j] & rerun:
+                rerun.add(j)
+        return rerun
+
+    def _execute(self, cell):
+        code = (cell.code or cell.source) if isinstance(cell, CompiledCell) else cell
+        source = cell.source if isinstance(cell, CompiledCell) else cell
+        before = dict(self.ns)
+        exec(code, self.ns)
+        changed = {k for k, v in self.ns.items() if k not in before or before[k] is not v}
+        changed |= CellInfo(source).mutates & self.ns.keys()
+        changed.discard("__builtins__")
+        snap = _copy({k: self.ns[k] for k in changed})
+        snap.update({k: _DELETED for k in before.keys() - self.ns.keys()})
+        snap[_RNG] = _rng_state()
+        return snap
+
+    def _restore(self, snap):
+        _set_rng_state(snap[_RNG])
+        values = _copy({k: v for k, v in snap.items() if v is not _DELETED and k != _RNG})
+        for name, value in snap.items():
+            if name == _RNG:
+                continue
+            if value is _DELETED:
+                self.ns.pop(name, None)
+            else:
+                self.ns[name] = values[name]
+
+
+def _copy(values):
+    """Deep-copy a dict of values, keeping uncopyable ones (modules) by reference."""
+    try:
+        return copy.deepcopy(values)
+    except Exception:
+        out = {}
+        for name, value in values.items():
+            try:
+                out[name] = copy.deepcopy(value)
+            except Exception:
+                out[name] = value
+        return out
+
+
+def _rng_state():
+    numpy = sys.modules.get("numpy")
+    return random.getstate(), numpy.random.get_state() if numpy is not None else None
+
+
+def _set_rng_state(state):
+    py_state, np_state = state
+    random.setstate(py_state)
+    if np_state is not None:
+        sys.modules["numpy"].random.set_state(np_state)
@@ -0,0 +1,134 @@
+"""Single-pass kernel execution.
+
+The notebook runs once in a real Jupyter kernel, which proves it executes,
+and a trailing hidden cell pickles the requested globals to a temporary
+file that is loaded back into the test process. The kernel needs
+cloudpickle: the suites export notebook-defined functions, which the
+standard pickle module would store as references to the kernel's
+``__main__`` that cannot be resolved in the test process.
+"""
+import os
+import pickle
+import tempfile
+
+import nbformat
+from jupyter_client import BlockingKernelClient
+from nbclient import NotebookClient
+
+from harness.pool import CHDIR, RESET
+
+
+KERNEL_ENV = "HARNESS_KERNEL"
+
+
+EXPORT_TEMPLATE = '''\
+def __harness_export(path, names):
+    import pickle
+    try:
+        import cloudpickle
+    except ImportError:
+        raise ImportError(
+            "cloudpickle is required in the kernel to export notebook variables "
+            "(pip install cloudpickle)"
+        ) from None
+    g = globals()
+    payload, failed = {{}}, []
+    for name in names:
+        if name not in g:
+            continue
+        try:
+            payload[name] = cloudpickle.dumps(g[name], protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            failed.append(name)
+    if failed:
+        raise TypeError(f"cannot transfer notebook variables: {{failed}}")
+    with open(path, "wb") as f:
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+__harness_export({path!r}, {names!r})
+del __harness_export
+'''
+
+
+def build_notebook(sources, export_path=None, names=()):
+    """Assemble an executable notebook from code cell sources.
+
+    When ``export_path`` is given, a final cell is appended that writes the
+    requested globals to that file.
+    """
+    nb = nbformat.v4.new_notebook()
+    nb.cells = [nbformat.v4.new_code_cell(src) for src in sources]
+    if export_path is not None:
+        code = EXPORT_TEMPLATE.format(path=export_path, names=list(names))
+        nb.cells.append(nbformat.v4.new_code_cell(code))
+    return nb
+
+
+def read_export(path):
+    """Load the payload written by the export cell."""
+    with open(path, "rb") as f:
+        payload = pickle.load(f)
+    return {name: pickle.loads(blob) for name, blob in payload.items()}
+
+
+def run_on_connected_kernel(nb, connection_file, cwd, timeout=600):
+    """Execute ``nb`` on a kernel that another process started and owns.
+
+    The kernel's namespace is cleared and its working directory set to
+    ``cwd`` first; the owner resets it again when it takes the kernel back.
+    """
+    kc = BlockingKernelClient(connection_file=connection_file)
+    kc.load_connection_file()
+    kc.start_channels()
+    try:
+        kc.wait_for_ready(timeout=60)
+        for code in (RESET, CHDIR.format(cwd=os.path.abspath(cwd))):
+            reply = kc.execute_interactive(code, store_history=False, timeout=60,
+                                           output_hook=lambda msg: None)
+            if reply["content"]["status"] != "ok":
+                raise RuntimeError(f"could not prepare kernel: {reply['content'].get('evalue')}")
+        client = NotebookClient(nb, timeout=timeout)
+        client.kc = kc
+        client.reset_execution_trackers()
+        for index, cell in enumerate(nb.cells):
+            client.execute_cell(cell, index)
+    finally:
+        kc.stop_channels()
+
+
+def execute_in_kernel(sources, names, timeout=600, kernel_name="python3", cwd=None, pool=None):
+    """Execute cell sources in a kernel and return the requested globals.
+
+    With a ``pool`` the notebook runs on a leased warm kernel. Otherwise,
+    when ``$HARNESS_KERNEL`` names a connection file (``harness.runner``
+    sets it for each task it leases a warm kernel to), the notebook runs on
+    that kernel; failing both, a fresh ``kernel_name`` kernel is started
+    and shut down. Names the
+    notebook never defines are left out of the result so callers can
+    report them. Execution errors propagate as
+    ``nbclient.exceptions.CellExecutionError``.
+    """
+    cwd = os.getcwd() if cwd is None else cwd
+    fd, export_path = tempfile.mkstemp(suffix=".pkl", prefix="harness-")
+    os.close(fd)
+    try:
+        nb = build_notebook(sources, export_path, names)
+        connection_file = os.environ.get(KERNEL_ENV)
+        if pool is None and connection_file:
+            run_on_connected_kernel(nb, connection_file, cwd, timeout)
+        elif pool is None:
+            client = NotebookClient(
+                nb,
+                timeout=timeout,
+                kernel_name=kernel_name,
+                resources={"metadata": {"path": cwd}},
+            )
+            client.execute()
+        else:
+            with pool.lease(cwd=cwd) as kernel:
+                client = NotebookClient(nb, km=kernel.km, timeout=timeout)
+                client.kc = kernel.kc
+                client.execute()
+        return read_export(export_path)
+    finally:
+        os.remove(export_path)
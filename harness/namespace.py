@@ -0,0 +1,127 @@
+"""Session-scoped notebook namespaces.
+
+Each notebook is executed at most once per process. The resulting globals
+are cached under a hash of the notebook's code cells, so every test that
+asks for the same notebook shares one execution.
+
+``load_namespace`` executes in-process from the compiled-cell cache;
+``kernel_namespace`` executes in a Jupyter kernel and brings back only the
+requested variables, so a single run both proves the notebook executes and
+feeds the value checks.
+"""
+import copy
+import hashlib
+from collections.abc import Mapping
+
+from harness.codecache import CompiledCell, load_cells, read_sources
+from harness.kernel import execute_in_kernel
+
+
+_CACHE = {}
+_KERNEL_CACHE = {}
+
+
+def code_cells(path):
+    """Return the source of every code cell in the notebook, in order."""
+    return read_sources(path)
+
+
+def code_hash(sources):
+    """Hash a sequence of cell sources into a stable cache key."""
+    h = hashlib.sha256()
+    for src in sources:
+        h.update(src.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class NamespaceView(Mapping):
+    """Read-only view of a cached namespace.
+
+    With ``copy=True`` every lookup returns a deep copy, so a test that
+    mutates a DataFrame or refits a model cannot leak into the next test.
+    Objects that cannot be copied (modules, open handles) are returned as-is.
+    """
+
+    def __init__(self, ns, copy=True):
+        self._ns = ns
+        self._copy = copy
+
+    def __getitem__(self, key):
+        value = self._ns[key]
+        if not self._copy:
+            return value
+        try:
+            return copy.deepcopy(value)
+        except Exception:
+            return value
+
+    def __contains__(self, key):
+        return key in self._ns
+
+    def __iter__(self):
+        return iter(self._ns)
+
+    def __len__(self):
+        return len(self._ns)
+
+    def __repr__(self):
+        return f"NamespaceView({len(self._ns)} names)"
+
+
+def execute_cells(cells, ns=None, hook=None):
+    """Execute cells in order and return the shared globals dict.
+
+    ``cells`` holds source strings or ``CompiledCell`` objects from
+    ``load_cells``. ``hook(index, source)`` may return a context manager
+    that wraps the execution of each cell, e.g. a
+    ``harness.profile.CellProfiler``.
+    """
+    ns = {} if ns is None else ns
+    for index, cell in enumerate(cells):
+        if isinstance(cell, CompiledCell):
+            code, src = cell.code or cell.source, cell.source
+        else:
+            code = src = cell
+        if hook is None:
+            exec(code, ns)
+        else:
+            with hook(index, src):
+                exec(code, ns)
+    return ns
+
+
+def load_namespace(path, copy=True):
+    """Execute the notebook once per session and return a view of its globals."""
+    cells = load_cells(path)
+    key = code_hash(cell.source for cell in cells)
+    if key not in _CACHE:
+        _CACHE[key] = execute_cells(cells)
+    return NamespaceView(_CACHE[key], copy=copy)
+
+
+def kernel_namespace(path, names, timeout=600, kernel_name="python3", copy=True, pool=None):
+    """Execute the notebook once per session in a kernel and return the named globals.
+
+    A later call asking for names that were not fetched re-runs the notebook
+    for the union of both requests. With a ``pool`` the notebook runs on a
+    leased warm kernel instead of a freshly started one.
+    """
+    sources = code_cells(path)
+    key = code_hash(sources)
+    fetched, values = _KERNEL_CACHE.get(key, (frozenset(), {}))
+    wanted = frozenset(names)
+    if key not in _KERNEL_CACHE or not wanted <= fetched:
+        fetched = fetched | wanted
+        values = execute_in_kernel(
+            sources, sorted(fetched), timeout=timeout, kernel_name=kernel_name,
+            pool=pool,
+        )
+        _KERNEL_CACHE[key] = (fetched, values)
+    return NamespaceView(values, copy=copy)
+
+
+def clear_cache():
+    """Drop every cached namespace."""
+    _CACHE.clear()
+    _KERNEL_CACHE.clear()
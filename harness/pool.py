@@ -0,0 +1,153 @@
+"""Warm Jupyter kernel pool.
+
+Starting a python3 kernel and importing pandas/scipy/sklearn costs a few
+seconds, which dominates the small task notebooks. A ``KernelPool`` keeps
+kernels running with those libraries already imported and leases them out
+one notebook at a time. Every lease starts from an empty user namespace:
+the kernel is reset with ``%reset -f`` on release, the reset is verified,
+and a kernel that fails either step is restarted before it is reused.
+
+A pool only pays off when one long-lived process serves several
+notebooks. ``harness.runner`` owns one and leases a kernel to each task's
+pytest process through ``$HARNESS_KERNEL``; within a single process, pass
+a pool to ``kernel_namespace`` explicitly. A reused kernel keeps its
+imported modules, which is the point; the reset also closes any open
+matplotlib figures.
+"""
+import os
+import queue
+from contextlib import contextmanager
+
+from jupyter_client import KernelManager
+
+
+PRELOAD = """\
+import importlib as __harness_importlib
+for __harness_name in ("numpy", "pandas", "scipy.linalg", "sklearn", "matplotlib"):
+    try:
+        __harness_importlib.import_module(__harness_name)
+    except ImportError:
+        pass
+del __harness_importlib, __harness_name
+"""
+
+RESET = """\
+import sys as __harness_sys
+if "matplotlib.pyplot" in __harness_sys.modules:
+    __harness_sys.modules["matplotlib.pyplot"].close("all")
+del __harness_sys
+%reset -f
+"""
+
+CHECK_EMPTY = """\
+__harness_ip = get_ipython()
+__harness_left = [
+    n for n in __harness_ip.user_ns
+    if not n.startswith("_") and n not in __harness_ip.user_ns_hidden
+]
+del __harness_ip
+if __harness_left:
+    raise RuntimeError(f"namespace not reset: {__harness_left}")
+del __harness_left
+"""
+
+CHDIR = "import os as __harness_os\n__harness_os.chdir({cwd!r})\ndel __harness_os\n"
+
+
+class PooledKernel:
+    """A running kernel and its blocking client."""
+
+    def __init__(self, kernel_name="python3", preload=PRELOAD, startup_timeout=60):
+        self.kernel_name = kernel_name
+        self.preload = preload
+        self.startup_timeout = startup_timeout
+        self.km = KernelManager(kernel_name=kernel_name)
+        self.kc = None
+        self.start()
+
+    def start(self):
+        self.km.start_kernel()
+        self.kc = self.km.client()
+        self.kc.start_channels()
+        self.kc.wait_for_ready(timeout=self.startup_timeout)
+        if self.preload:
+            self.run(self.preload, timeout=self.startup_timeout)
+
+    def run(self, code, timeout=60):
+        """Execute code silently and raise if the kernel reports an error."""
+        reply = self.kc.execute_interactive(
+            code, silent=False, store_history=False, timeout=timeout,
+            output_hook=lambda msg: None,
+        )
+        content = reply["content"]
+        if content["status"] != "ok":
+            raise RuntimeError(f"{content.get('ename')}: {content.get('evalue')}")
+
+    def reset(self, timeout=60):
+        """Clear the user namespace, restarting the kernel if that fails."""
+        try:
+            self.run(RESET, timeout=timeout)
+            self.run(CHECK_EMPTY, timeout=timeout)
+        except Exception:
+            self.restart()
+
+    def restart(self):
+        self.kc.stop_channels()
+        if self.km.has_kernel:
+            self.km.shutdown_kernel(now=True)
+        self.start()
+
+    def shutdown(self):
+        if self.kc is not None:
+            self.kc.stop_channels()
+            self.kc = None
+        if self.km.has_kernel:
+            self.km.shutdown_kernel(now=True)
+
+
+class KernelPool:
+    """Fixed-size pool of pre-started, pre-imported kernels.
+
+    Use as a context manager, or call ``shutdown()`` when done::
+
+        with KernelPool(size=2) as pool:
+            with pool.lease(cwd="TASK_520") as kernel:
+                ...
+    """
+
+    def __init__(self, size=2, kernel_name="python3", preload=PRELOAD, startup_timeout=60):
+        self.size = size
+        self.kernel_name = kernel_name
+        self._kernels = []
+        self._idle = queue.Queue()
+        for _ in range(size):
+            kernel = PooledKernel(kernel_name, preload, startup_timeout)
+            self._kernels.append(kernel)
+            self._idle.put(kernel)
+
+    @contextmanager
+    def lease(self, cwd=None, timeout=None):
+        """Borrow an idle kernel whose working directory is ``cwd``.
+
+        Blocks until a kernel is free. The namespace is reset when the
+        lease ends, whether or not the notebook succeeded.
+        """
+        kernel = self._idle.get(timeout=timeout)
+        try:
+            kernel.run(CHDIR.format(cwd=os.path.abspath(cwd or os.getcwd())))
+            yield kernel
+        finally:
+            kernel.reset()
+            self._idle.put(kernel)
+
+    def shutdown(self):
+        for kernel in self._kernels:
+            kernel.shutdown()
+        self._kernels = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
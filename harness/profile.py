@@ -0,0 +1,124 @@
+"""Per-cell timing and memory profiles for notebook execution.
+
+``CellProfiler`` plugs into ``execute_cells`` as its per-cell hook and
+records wall time, process CPU time and the tracemalloc peak of every code
+cell. ``profile_notebook`` runs a notebook in-process under the profiler
+and writes the rows as JSON or CSV so a slowdown can be traced to a cell::
+
+    python -m harness.profile TASK_520/final_notebook.ipynb --csv
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from harness.codecache import load_cells
+from harness.namespace import execute_cells
+
+
+FIELDS = ["cell", "first_line", "wall_s", "cpu_s", "peak_bytes"]
+
+
+class CellProfiler:
+    """Hook for ``execute_cells`` that records one row per executed cell.
+
+    ``peak_bytes`` is the tracemalloc peak during the cell, measured above
+    the memory already allocated when the cell started. tracemalloc slows
+    allocation-heavy code, so pass ``memory=False`` for timing-only runs.
+    """
+
+    def __init__(self, memory=True):
+        self.memory = memory
+        self.rows = []
+
+    @contextmanager
+    def __call__(self, index, source):
+        started_tracing = False
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+            peak = None
+            if self.memory:
+                _, peak = tracemalloc.get_traced_memory()
+                peak = max(peak - base, 0)
+                if started_tracing:
+                    tracemalloc.stop()
+            self.rows.append({
+                "cell": index,
+                "first_line": first_line(source),
+                "wall_s": round(wall, 6),
+                "cpu_s": round(cpu, 6),
+                "peak_bytes": peak,
+            })
+
+
+def first_line(source):
+    """First non-blank, non-comment line of a cell, for labelling rows."""
+    for line in source.splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            return line[:80]
+    return ""
+
+
+def profile_notebook(path, memory=True):
+    """Execute the notebook in-process and return its per-cell rows."""
+    profiler = CellProfiler(memory=memory)
+    execute_cells(load_cells(path), hook=profiler)
+    return profiler.rows
+
+
+def write_profile(rows, path):
+    """Write rows as CSV when ``path`` ends in .csv, JSON otherwise."""
+    if path.endswith(".csv"):
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(path, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+def profile_name(notebook_path, ext):
+    """``TASK_520/final_notebook.ipynb`` -> ``TASK_520-final_notebook.profile.json``."""
+    path = os.path.abspath(notebook_path)
+    task = os.path.basename(os.path.dirname(path))
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return f"{task}-{stem}.profile.{ext}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile notebook cells.")
+    parser.add_argument("notebooks", nargs="+")
+    parser.add_argument("-o", "--out-dir", default=".profiles")
+    parser.add_argument("--csv", action="store_true", help="write CSV instead of JSON")
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    for nb_path in args.notebooks:
+        rows = profile_notebook(nb_path, memory=not args.no_memory)
+        out = os.path.join(args.out_dir, profile_name(nb_path, "csv" if args.csv else "json"))
+        write_profile(rows, out)
+        slowest = max(rows, key=lambda r: r["wall_s"]) if rows else None
+        if slowest:
+            print(f"{nb_path}: {len(rows)} cells, slowest cell {slowest['cell']} "
+                  f"({slowest['wall_s']:.3f}s) -> {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
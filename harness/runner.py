@@ -0,0 +1,164 @@
+"""Run every TASK_* suite in parallel.
+
+Each task folder that has a ``test_notebook.py`` is copied into its own
+temporary directory and tested there by a separate pytest process, so
+notebooks that write into the working directory (TASK_536 exports three
+files) never touch the checkout or each other. Results from all folders
+merge into one report with per-task timings::
+
+    python -m harness.runner                 # all tasks, one worker per CPU
+    python -m harness.runner TASK_520 -j 2   # selected tasks
+    python -m harness.runner --json report.json
+    python -m harness.runner --no-kernel-pool
+
+The runner keeps one warm kernel per worker (``harness.pool``) for the
+whole run and leases it to each task's pytest process, which connects to
+it through ``$HARNESS_KERNEL`` instead of starting a kernel and
+re-importing numpy/pandas/scipy for every notebook. Workers are threads:
+they only wait on the pytest subprocesses.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from harness.kernel import KERNEL_ENV
+from harness.pool import KernelPool
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_FILE = "test_notebook.py"
+
+
+def discover_tasks(root=REPO_ROOT):
+    """Return the task folders under ``root`` that have a notebook test suite."""
+    tasks = []
+    for name in sorted(os.listdir(root)):
+        path = os.path.join(root, name)
+        if os.path.isfile(os.path.join(path, TEST_FILE)):
+            tasks.append(path)
+    return tasks
+
+
+def parse_junit(path):
+    """Summarise a pytest junit XML report as a dict of counts."""
+    suite = ET.parse(path).getroot()
+    if suite.tag == "testsuites":
+        suite = suite[0]
+    counts = {k: int(suite.get(k, 0)) for k in ("tests", "failures", "errors", "skipped")}
+    failed = []
+    for case in suite.iter("testcase"):
+        if case.find("failure") is not None or case.find("error") is not None:
+            failed.append(case.get("name"))
+    counts["failed_tests"] = failed
+    return counts
+
+
+def run_task(task_dir, timeout=1800, pool=None):
+    """Copy one task folder into a scratch directory and run its suite there.
+
+    With a ``pool`` the suite's notebooks run on a kernel leased from it.
+    """
+    name = os.path.basename(task_dir.rstrip(os.sep))
+    scratch = tempfile.mkdtemp(prefix="task-")
+    workdir = os.path.join(scratch, name)
+    shutil.copytree(task_dir, workdir, ignore=shutil.ignore_patterns("__pycache__", ".pytest_cache"))
+    junit = os.path.join(scratch, "junit.xml")
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (REPO_ROOT, env.get("PYTHONPATH")) if p)
+    cmd = [
+        sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider",
+        f"--junitxml={junit}", TEST_FILE,
+    ]
+    start = time.perf_counter()
+    with pool.lease(cwd=workdir) if pool is not None else nullcontext() as kernel:
+        if kernel is not None:
+            env[KERNEL_ENV] = kernel.km.connection_file
+        try:
+            proc = subprocess.run(
+                cmd, cwd=workdir, env=env, capture_output=True, text=True, timeout=timeout,
+            )
+            returncode, output = proc.returncode, proc.stdout + proc.stderr
+        except subprocess.TimeoutExpired as e:
+            returncode, output = None, f"timed out after {timeout}s\n{e.stdout or ''}"
+            if kernel is not None:
+                # The kernel may still be busy with the abandoned notebook
+                kernel.restart()
+    elapsed = time.perf_counter() - start
+    result = {
+        "task": name,
+        "returncode": returncode,
+        "passed": returncode == 0,
+        "seconds": round(elapsed, 3),
+        "tests": 0, "failures": 0, "errors": 0, "skipped": 0, "failed_tests": [],
+    }
+    if os.path.exists(junit):
+        result.update(parse_junit(junit))
+    if not result["passed"]:
+        result["output"] = output[-4000:]
+    shutil.rmtree(scratch, ignore_errors=True)
+    return result
+
+
+def run_all(tasks, workers=None, timeout=1800, kernel_pool=True):
+    """Run ``tasks`` on worker threads and return results in task order."""
+    workers = min(workers or os.cpu_count() or 1, max(len(tasks), 1))
+    pool = KernelPool(size=workers) if kernel_pool and tasks else None
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(lambda task: run_task(task, timeout, pool), tasks))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+
+def format_report(results, wall):
+    lines = [f"{'task':<24} {'status':<7} {'tests':>5} {'fail':>5} {'err':>5} {'time':>8}"]
+    for r in results:
+        status = "ok" if r["passed"] else "FAILED"
+        lines.append(
+            f"{r['task']:<24} {status:<7} {r['tests']:>5} {r['failures']:>5} "
+            f"{r['errors']:>5} {r['seconds']:>7.2f}s"
+        )
+    n_failed = sum(not r["passed"] for r in results)
+    total = sum(r["seconds"] for r in results)
+    lines.append(
+        f"{len(results)} tasks, {len(results) - n_failed} passed, {n_failed} failed "
+        f"in {wall:.2f}s wall ({total:.2f}s summed)"
+    )
+    for r in results:
+        if not r["passed"]:
+            lines.append(f"\n--- {r['task']} ---\n{r.get('output', '').rstrip()}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("tasks", nargs="*", help="task folders (default: all)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="workers (default: CPU count)")
+    parser.add_argument("--timeout", type=int, default=1800, help="per-task timeout in seconds")
+    parser.add_argument("--json", dest="json_path", help="also write the merged report as JSON")
+    parser.add_argument("--no-kernel-pool", dest="kernel_pool", action="store_false",
+                        help="start a fresh kernel for every notebook")
+    args = parser.parse_args(argv)
+
+    tasks = [os.path.abspath(t) for t in args.tasks] or discover_tasks()
+    start = time.perf_counter()
+    results = run_all(tasks, workers=args.workers, timeout=args.timeout, kernel_pool=args.kernel_pool)
+    wall = time.perf_counter() - start
+    print(format_report(results, wall))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"wall_seconds": round(wall, 3), "results": results}, f, indent=2)
+    return 0 if all(r["passed"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
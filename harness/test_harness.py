@@ -0,0 +1,473 @@
+import nbformat
+import pytest
+from nbclient.exceptions import CellExecutionError
+
+from harness import (
+    CellProfiler,
+    IncrementalRunner,
+    KernelPool,
+    NamespaceView,
+    clear_cache,
+    code_cells,
+    code_hash,
+    execute_cells,
+    kernel_namespace,
+    load_cells,
+    load_namespace,
+    profile_notebook,
+)
+from harness import codecache
+from harness.bench import bench_notebook, compare, load_baseline, main, p95, save_baseline
+from harness.incremental import CellInfo, dependency_graph
+from harness.profile import write_profile
+from harness.runner import discover_tasks, run_all, run_task
+
+
+def write_notebook(path, *sources):
+    nb = nbformat.v4.new_notebook()
+    nb.cells = [nbformat.v4.new_markdown_cell("# Title")]
+    nb.cells += [nbformat.v4.new_code_cell(src) for src in sources]
+    with open(path, "w", encoding="utf-8") as f:
+        nbformat.write(nb, f)
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(tmp_path_factory, monkeypatch):
+    monkeypatch.setenv("HARNESS_CACHE_DIR", str(tmp_path_factory.mktemp("codecache")))
+    clear_cache()
+    yield
+    clear_cache()
+
+
+def test_code_cells_skip_markdown(tmp_path):
+    path = write_notebook(tmp_path / "nb.ipynb", "a = 1", "b = a + 1")
+    assert code_cells(path) == ["a = 1", "b = a + 1"]
+
+
+def test_code_hash_depends_on_cell_boundaries():
+    assert code_hash(["a = 1", "b = 2"]) == code_hash(["a = 1", "b = 2"])
+    assert code_hash(["a = 1", "b = 2"]) != code_hash(["a = 1b = 2"])
+
+
+def test_notebook_executes_once_per_session(tmp_path):
+    path = write_notebook(tmp_path / "nb.ipynb", "calls = []", "calls.append(1)")
+    first = load_namespace(path)
+    second = load_namespace(path)
+    assert first["calls"] == [1]
+    assert second["calls"] == [1]
+
+
+def test_identical_code_shares_cache_entry(tmp_path):
+    a = write_notebook(tmp_path / "a.ipynb", "import random\nx = random.random()")
+    b = write_notebook(tmp_path / "b.ipynb", "import random\nx = random.random()")
+    assert load_namespace(a)["x"] == load_namespace(b)["x"]
+
+
+def test_view_is_copy_on_access(tmp_path):
+    path = write_notebook(tmp_path / "nb.ipynb", "data = {'k': [1, 2]}")
+    ns = load_namespace(path)
+    ns["data"]["k"].append(3)
+    assert ns["data"] == {"k": [1, 2]}
+    assert isinstance(ns, NamespaceView)
+    with pytest.raises(TypeError):
+        ns["data"] = None
+
+
+def test_view_without_copy_shares_objects(tmp_path):
+    path = write_notebook(tmp_path / "nb.ipynb", "data = []")
+    ns = load_namespace(path, copy=False)
+    assert ns["data"] is load_namespace(path, copy=False)["data"]
+
+
+def test_uncopyable_values_are_returned_as_is(tmp_path):
+    path = write_notebook(tmp_path / "nb.ipynb", "import math")
+    ns = load_namespace(path)
+    assert ns["math"].pi > 3
+
+
+def test_kernel_namespace_returns_requested_names(tmp_path):
+    path = write_notebook(
+        tmp_path / "nb.ipynb",
+        "import numpy as np\nimport pandas as pd",
+        "arr = np.arange(4.0)\nframe = pd.DataFrame({'a': arr})\nunused = 1",
+        "def double(v):\n    return 2 * v",
+    )
+    ns = kernel_namespace(path, ["arr", "frame", "double", "missing"])
+    assert set(ns) == {"arr", "frame", "double"}
+    assert ns["arr"].tolist() == [0.0, 1.0, 2.0, 3.0]
+    assert ns["frame"]["a"].sum() == 6.0
+    assert ns["double"](4) == 8
+
+
+def test_kernel_namespace_fetches_union_on_new_names(tmp_path):
+    path = write_notebook(tmp_path / "nb.ipynb", "a = 1\nb = 2")
+    assert set(kernel_namespace(path, ["a"])) == {"a"}
+    assert set(kernel_namespace(path, ["b"])) == {"a", "b"}
+
+
+def test_kernel_namespace_runs_ipython_magics(tmp_path):
+    path = write_notebook(tmp_path / "nb.ipynb", "%matplotlib inline\nx = 1", "!echo hi\ny = x + 1")
+    assert dict(kernel_namespace(path, ["y"])) == {"y": 2}
+
+
+def test_kernel_namespace_surfaces_cell_errors(tmp_path):
+    path = write_notebook(tmp_path / "nb.ipynb", "raise ValueError('boom')")
+    with pytest.raises(CellExecutionError, match="boom"):
+        kernel_namespace(path, ["a"])
+
+
+def test_kernel_export_requires_cloudpickle(tmp_path):
+    # A None entry in sys.modules makes the kernel's import of cloudpickle fail
+    path = write_notebook(tmp_path / "nb.ipynb", "import sys\nsys.modules['cloudpickle'] = None\na = 1")
+    with pytest.raises(CellExecutionError, match="cloudpickle is required"):
+        kernel_namespace(path, ["a"])
+
+
+@pytest.fixture(scope="module")
+def pool():
+    with KernelPool(size=1) as pool:
+        yield pool
+
+
+def test_pool_runs_in_current_directory(pool, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = write_notebook(tmp_path / "nb.ipynb", "import os\ncwd = os.getcwd()")
+    ns = kernel_namespace(path, ["cwd"], pool=pool)
+    assert ns["cwd"] == str(tmp_path)
+
+
+def test_pool_resets_namespace_between_leases(pool, tmp_path):
+    first = write_notebook(tmp_path / "a.ipynb", "leaked = 1")
+    second = write_notebook(tmp_path / "b.ipynb", "seen = 'leaked' in globals()")
+    kernel_namespace(first, ["leaked"], pool=pool)
+    assert kernel_namespace(second, ["seen"], pool=pool)["seen"] is False
+
+
+def test_pool_kernel_is_reusable_after_failure(pool, tmp_path):
+    broken = write_notebook(tmp_path / "a.ipynb", "partial = 1\nraise ValueError('boom')")
+    with pytest.raises(CellExecutionError):
+        kernel_namespace(broken, ["partial"], pool=pool)
+    ok = write_notebook(tmp_path / "b.ipynb", "seen = 'partial' in globals()")
+    assert kernel_namespace(ok, ["seen"], pool=pool)["seen"] is False
+
+
+def make_task(root, name, check):
+    task = root / name
+    task.mkdir()
+    write_notebook(task / "final_notebook.ipynb", "open('export.txt', 'w').write('x')\nvalue = 3")
+    (task / "test_notebook.py").write_text(
+        "from harness import kernel_namespace\n\n"
+        "def test_value():\n"
+        f"    assert kernel_namespace('final_notebook.ipynb', ['value'])['value'] {check}\n"
+    )
+    return task
+
+
+def test_discover_tasks_requires_test_file(tmp_path):
+    make_task(tmp_path, "TASK_1", "== 3")
+    (tmp_path / "TASK_2").mkdir()
+    write_notebook(tmp_path / "TASK_2" / "final_notebook.ipynb", "a = 1")
+    assert [p.rsplit("/", 1)[-1] for p in discover_tasks(str(tmp_path))] == ["TASK_1"]
+
+
+def test_run_task_isolates_working_directory(tmp_path):
+    task = make_task(tmp_path, "TASK_1", "== 3")
+    result = run_task(str(task))
+    assert result["passed"] and result["tests"] == 1
+    assert result["seconds"] > 0
+    assert not (task / "export.txt").exists()
+
+
+def test_run_all_reuses_one_warm_kernel_per_worker(tmp_path):
+    tasks = []
+    for name, source in [("TASK_1", "secret = 1"), ("TASK_2", "leaked = 'secret' in globals()")]:
+        task = tmp_path / name
+        task.mkdir()
+        write_notebook(task / "final_notebook.ipynb", "import os\nkernel_pid = os.getpid()\ncwd = os.getcwd()", source)
+        (task / "test_notebook.py").write_text(
+            "import os\n"
+            "from harness import kernel_namespace\n\n"
+            "def test_kernel():\n"
+            "    ns = kernel_namespace('final_notebook.ipynb', ['kernel_pid', 'cwd', 'leaked'])\n"
+            "    assert ns['cwd'] == os.getcwd() and not ns.get('leaked', False)\n"
+            f"    open({str(tmp_path)!r} + '/' + {name!r} + '.pid', 'w').write(str(ns['kernel_pid']))\n"
+        )
+        tasks.append(str(task))
+
+    def pids():
+        return {(tmp_path / f"{n}.pid").read_text() for n in ("TASK_1", "TASK_2")}
+
+    assert all(r["passed"] for r in run_all(tasks, workers=1))
+    assert len(pids()) == 1
+    assert all(r["passed"] for r in run_all(tasks, workers=1, kernel_pool=False))
+    assert len(pids()) == 2
+
+
+def test_run_task_reports_failures(tmp_path):
+    task = make_task(tmp_path, "TASK_1", "== 4")
+    result = run_task(str(task))
+    assert not result["passed"]
+    assert result["failures"] == 1 and result["failed_tests"] == ["test_value"]
+
+
+def test_profile_records_one_row_per_code_cell(tmp_path):
+    path = write_notebook(
+        tmp_path / "nb.ipynb",
+        "# setup\nimport time",
+        "buf = bytearray(5_000_000)\ndel buf",
+        "time.sleep(0.05)",
+    )
+    rows = profile_notebook(path)
+    assert [r["cell"] for r in rows] == [0, 1, 2]
+    assert rows[0]["first_line"] == "import time"
+    assert rows[1]["peak_bytes"] >= 5_000_000
+    assert rows[2]["wall_s"] >= 0.05 > rows[2]["cpu_s"]
+
+
+def test_profile_hook_sees_cell_errors():
+    profiler = CellProfiler(memory=False)
+    with pytest.raises(ZeroDivisionError):
+        execute_cells(["a = 1", "1 / 0"], hook=profiler)
+    assert [r["cell"] for r in profiler.rows] == [0, 1]
+    assert profiler.rows[1]["peak_bytes"] is None
+
+
+def test_write_profile_csv(tmp_path):
+    rows = profile_notebook(write_notebook(tmp_path / "nb.ipynb", "a = 1"), memory=False)
+    out = tmp_path / "p.csv"
+    write_profile(rows, str(out))
+    assert out.read_text().splitlines()[0] == "cell,first_line,wall_s,cpu_s,peak_bytes"
+
+
+def test_p95_nearest_rank():
+    assert p95([3.0]) == 3.0
+    assert p95([float(i) for i in range(1, 21)]) == 19.0
+
+
+def test_compare_flags_time_and_memory_regressions():
+    baseline = {"results": {
+        "T/a.ipynb": {"median_s": 1.0, "peak_rss_mb": 100.0},
+        "T/b.ipynb": {"median_s": 1.0, "peak_rss_mb": 100.0},
+        "T/c.ipynb": {"median_s": 1.0, "peak_rss_mb": 100.0},
+    }}
+    rows = compare([
+        {"notebook": "T/a.ipynb", "median_s": 1.1, "peak_rss_mb": 100.0},
+        {"notebook": "T/b.ipynb", "median_s": 1.5, "peak_rss_mb": 100.0},
+        {"notebook": "T/c.ipynb", "median_s": 1.0, "peak_rss_mb": 150.0},
+        {"notebook": "T/d.ipynb", "median_s": 1.0, "peak_rss_mb": 100.0},
+        {"notebook": "T/e.ipynb", "error": "boom"},
+    ], baseline, threshold=0.2, memory_threshold=0.2)
+    assert [r["status"] for r in rows] == ["ok", "regressed", "regressed", "new", "error"]
+    assert rows[1]["time_ratio"] == 1.5
+
+
+def test_compare_ignores_small_absolute_slowdowns_and_known_errors():
+    baseline = {"results": {
+        "T/tiny.ipynb": {"median_s": 0.0005, "peak_rss_mb": 100.0},
+        "T/slow.ipynb": {"median_s": 0.1, "peak_rss_mb": 100.0},
+        "T/starter.ipynb": {"notebook": "T/starter.ipynb", "error": "KeyError"},
+        "T/fixed.ipynb": {"notebook": "T/fixed.ipynb", "error": "KeyError"},
+    }}
+    rows = compare([
+        {"notebook": "T/tiny.ipynb", "median_s": 0.004, "peak_rss_mb": 100.0},
+        {"notebook": "T/slow.ipynb", "median_s": 0.2, "peak_rss_mb": 100.0},
+        {"notebook": "T/starter.ipynb", "error": "KeyError"},
+        {"notebook": "T/fixed.ipynb", "median_s": 1.0, "peak_rss_mb": 100.0},
+    ], baseline, min_time_delta=0.05)
+    assert [r["status"] for r in rows] == ["ok", "regressed", "expected-error", "new"]
+
+
+def test_bench_notebook_round_trips_through_baseline(tmp_path):
+    task = tmp_path / "TASK_1"
+    task.mkdir()
+    write_notebook(task / "final_notebook.ipynb", "data = list(range(100_000))")
+    row = bench_notebook(str(task), "final_notebook.ipynb", runs=2, warmup=0)
+    assert row["notebook"] == "TASK_1/final_notebook.ipynb"
+    assert 0 < row["median_s"] <= row["p95_s"] and row["peak_rss_mb"] > 0
+
+    path = str(tmp_path / "baseline.json")
+    save_baseline([row, {"notebook": "TASK_1/initial_notebook.ipynb", "error": "x"}], path)
+    baseline = load_baseline(path)
+    assert list(baseline["results"]) == ["TASK_1/final_notebook.ipynb", "TASK_1/initial_notebook.ipynb"]
+    assert compare([dict(row)], baseline)[0]["status"] == "ok"
+
+
+def test_bench_notebook_reports_failures(tmp_path):
+    task = tmp_path / "TASK_1"
+    task.mkdir()
+    write_notebook(task / "final_notebook.ipynb", "raise ValueError('boom')")
+    row = bench_notebook(str(task), "final_notebook.ipynb", runs=1, warmup=0)
+    assert "boom" in row["error"]
+
+
+def test_compare_reports_baseline_entries_that_did_not_run():
+    baseline = {"results": {
+        "T/final_notebook.ipynb": {"median_s": 1.0, "peak_rss_mb": 100.0},
+        "T/initial_notebook.ipynb": {"median_s": 1.0, "peak_rss_mb": 100.0},
+        "U/final_notebook.ipynb": {"median_s": 1.0, "peak_rss_mb": 100.0},
+    }}
+    rows = compare([], baseline, scope=lambda name: name.startswith("T/"))
+    assert [(r["notebook"], r["status"]) for r in rows] == [
+        ("T/final_notebook.ipynb", "missing"), ("T/initial_notebook.ipynb", "missing")]
+
+
+def test_bench_main_fails_on_errors_and_missing_notebooks(tmp_path, capsys):
+    good, broken, gone = (tmp_path / n for n in ("TASK_1", "TASK_2", "TASK_3"))
+    for task in (good, broken, gone):
+        task.mkdir()
+        write_notebook(task / "final_notebook.ipynb", "x = 1")
+    baseline = str(tmp_path / "baseline.json")
+    args = ["-n", "1", "--warmup", "0", "--baseline", baseline]
+    assert main([str(good), str(broken), str(gone), "--save-baseline"] + args) == 0
+    assert main([str(good), str(broken), str(gone)] + args) == 0
+
+    write_notebook(broken / "final_notebook.ipynb", "raise ValueError('boom')")
+    (gone / "final_notebook.ipynb").unlink()
+    capsys.readouterr()
+    assert main([str(good), str(broken), str(gone)] + args) == 1
+    out = capsys.readouterr().out
+    assert "failed to run: TASK_2/final_notebook.ipynb" in out
+    assert "did not run: TASK_3/final_notebook.ipynb" in out
+    # Notebooks outside the selected tasks are not reported as missing
+    assert main([str(good)] + args) == 0
+
+    # Once recorded in the baseline, a notebook that is meant to fail passes the gate
+    assert main([str(good), str(broken), "--save-baseline"] + args) == 0
+    assert main([str(good), str(broken)] + args) == 0
+
+
+def test_load_cells_compiles_once_and_reuses_bytecode(tmp_path, monkeypatch):
+    cache = tmp_path / "cache"
+    path = write_notebook(tmp_path / "nb.ipynb", "a = 1", "b = a + 1")
+    first = load_cells(path, cache_dir=str(cache))
+    assert len(list(cache.glob(f"*.{codecache.CACHE_TAG}.bin"))) == 2
+
+    codecache._MEMO.clear()
+    monkeypatch.setattr(codecache, "_parse", lambda p: pytest.fail("notebook was re-parsed"))
+    monkeypatch.setattr(codecache, "compile", lambda *a: pytest.fail("cell was recompiled"), raising=False)
+    second = load_cells(path, cache_dir=str(cache))
+    assert [c.digest for c in second] == [c.digest for c in first]
+    assert execute_cells(second)["b"] == 2
+
+
+def test_load_cells_notices_edits(tmp_path):
+    cache = str(tmp_path / "cache")
+    path = write_notebook(tmp_path / "nb.ipynb", "a = 1")
+    load_cells(path, cache_dir=cache)
+    write_notebook(tmp_path / "nb.ipynb", "a = 2", "b = 3")
+    codecache._MEMO.clear()
+    assert execute_cells(load_cells(path, cache_dir=cache))["a"] == 2
+
+
+def test_cached_cells_keep_traceback_attribution(tmp_path):
+    import traceback
+
+    cache = str(tmp_path / "cache")
+    src = "x = 1\n\ndef broken():\n    return 1 / 0\n"
+    path = write_notebook(tmp_path / "nb.ipynb", "pass", src, "broken()")
+    load_cells(path, cache_dir=cache)
+    codecache._MEMO.clear()
+    cells = load_cells(path, cache_dir=cache)
+    with pytest.raises(ZeroDivisionError) as info:
+        execute_cells(cells)
+    frame = traceback.extract_tb(info.tb)[-1]
+    assert frame.filename == f"<notebook {path} cell 1>"
+    assert frame.lineno == 4
+    assert frame.line == "return 1 / 0"
+
+
+def test_uncompilable_cells_fall_back_to_source(tmp_path):
+    cache = str(tmp_path / "cache")
+    path = write_notebook(tmp_path / "nb.ipynb", "a = 1", "%time b = 2")
+    for _ in range(2):
+        codecache._MEMO.clear()
+        cells = load_cells(path, cache_dir=cache)
+        assert cells[0].code is not None and cells[1].code is None
+        assert cells[1].source == "%time b = 2"
+
+
+def test_index_is_shared_by_copies_of_a_notebook(tmp_path, monkeypatch):
+    import shutil
+
+    cache = tmp_path / "cache"
+    path = write_notebook(tmp_path / "nb.ipynb", "a = 1")
+    load_cells(path, cache_dir=str(cache))
+    for i in range(3):
+        copy = tmp_path / f"scratch{i}" / "nb.ipynb"
+        copy.parent.mkdir()
+        shutil.copy(path, copy)
+        monkeypatch.setattr(codecache, "_parse", lambda p: pytest.fail("notebook was re-parsed"))
+        assert execute_cells(load_cells(str(copy), cache_dir=str(cache)))["a"] == 1
+    assert len(list((cache / "index").iterdir())) == 1
+
+
+def test_cell_info_reads_and_writes():
+    info = CellInfo(
+        "import numpy as np\n"
+        "def f(v):\n    return v + offset\n"
+        "total = sum(f(v) for v in data)\n"
+        "df['c'] = 1\nmodel.fit(df)\n"
+    )
+    assert info.writes == {"np", "f", "total"}
+    assert info.mutates == {"df", "model"}
+    assert {"offset", "data", "df", "model"} <= info.reads
+    assert "sum" not in info.reads and "v" in info.reads
+    assert not info.opaque
+    assert CellInfo("from math import *").opaque
+
+
+def test_dependency_graph_links_latest_writer():
+    infos = [CellInfo(s) for s in ["a = 1", "b = a", "a = 2", "c = a + b"]]
+    assert dependency_graph(infos) == [set(), {0}, set(), {1, 2}]
+
+
+def test_incremental_runner_reruns_only_downstream_cells():
+    runner = IncrementalRunner()
+    cells = ["calls = []\nbase = 2", "calls.append('fit')\nmodel = base * 10", "score = model + 1", "other = base"]
+    assert runner.run(cells) == [0, 1, 2, 3]
+    cells[2] = "score = model + 5"
+    assert runner.run(cells) == [2]
+    assert runner.ns["score"] == 25
+    assert runner.ns["calls"] == ["fit"]
+    cells[0] = "calls = []\nbase = 3"
+    assert runner.run(cells) == [0, 1, 2, 3]
+    assert runner.ns["score"] == 35 and runner.ns["other"] == 3
+    assert runner.run(cells) == []
+
+
+def test_incremental_runner_restores_mutations_and_deletions():
+    runner = IncrementalRunner()
+    cells = ["data = [1]\ntmp = 0", "data.append(2)\ndel tmp", "n = len(data)"]
+    runner.run(cells)
+    cells[2] = "n = len(data) * 10\nseen = 'tmp' in globals()"
+    assert runner.run(cells) == [2]
+    assert runner.ns["n"] == 20 and runner.ns["seen"] is False
+
+
+def test_incremental_runner_replays_global_random_state():
+    cells = ["import random\nimport numpy as np\nnp.random.seed(0)\nrandom.seed(0)",
+             "a = np.random.rand()", "b = np.random.rand()\nc = random.random()", "d = 1"]
+    runner = IncrementalRunner()
+    runner.run(cells)
+    cells[2] = "b = np.random.rand() + 0\nc = random.random()"
+    assert runner.run(cells) == [2]
+    reference = IncrementalRunner()
+    reference.run(cells)
+    assert runner.ns["b"] == reference.ns["b"] and runner.ns["c"] == reference.ns["c"]
+
+    # Editing an earlier draw re-runs every later cell that draws
+    cells[1] = "a = np.random.rand(3)"
+    assert runner.run(cells) == [1, 2]
+    reference = IncrementalRunner()
+    reference.run(cells)
+    assert runner.ns["b"] == reference.ns["b"]
+
+
+def test_incremental_runner_keeps_functions_bound_to_namespace():
+    runner = IncrementalRunner()
+    cells = ["scale = 3", "def f(v):\n    return v * scale", "out = f(2)"]
+    runner.run(cells)
+    cells[2] = "out = f(4)"
+    assert runner.run(cells) == [2]
+    assert runner.ns["out"] == 12